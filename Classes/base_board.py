@@ -0,0 +1,79 @@
+from .zobrist import SIDE_KEY, FIRST_MOVE_KEYS
+from .move_picker import MovePicker
+
+class InvalidCoordError(Exception):
+    pass
+
+class ParsePieceError(Exception):
+    pass
+
+class CoordCoversionError(Exception):
+    pass
+
+class BaseBoard:
+    #the part of the board interface written only in terms of other board methods, Board and BitBoard
+    #both inherit it so the two engines share one copy
+    def material(self, color):
+        return self.material_score[color]
+
+    def move_piece(self, start, end, turn_color, verbose=False):
+        def _print(msg):
+            if verbose:
+                print(msg)
+
+        if self.move_valid(start, end, turn_color, verbose=verbose):
+            self.make_move(start, end)
+            return True
+        _print("Invalid move")
+        return False
+
+    def make_null_move(self):
+        #pass the turn for null move pruning, only the side to move changes so only the hash does
+        self.hash ^= SIDE_KEY
+
+    def unmake_null_move(self):
+        self.hash ^= SIDE_KEY
+
+    def has_legal_move(self, color):
+        #stops at the first legal move instead of generating them all
+        for _ in MovePicker(self, color):
+            return True
+        return False
+
+    def legal_moves(self, color, noisy=True, quiet=True):
+        return list(self.iter_legal_moves(color, noisy, quiet))
+
+    def is_unmoved(self, position):
+        #the pawn, rook or king on position still has its first move (double push, castling)
+        return self.unmoved >> (position[0]*8 + position[1]) & 1
+
+    def clear_first_move(self, position):
+        #take away a piece's first move without moving it, for set up positions
+        sq = position[0]*8 + position[1]
+        if self.unmoved >> sq & 1:
+            self.unmoved ^= 1 << sq
+            self.hash ^= FIRST_MOVE_KEYS[sq]
+
+    def convert_coords(self, coords):
+        if not isinstance(coords, str):
+            raise CoordCoversionError("Coordinates must be a string")
+        if len(coords) != 2:
+            raise CoordCoversionError("Coordinates must be 2 characters")
+        try:
+            x = int(coords[1]) - 1
+            y = ord(coords[0].upper()) - ord("A")
+        except CoordCoversionError:
+            raise CoordCoversionError("Coordinates must be in the format A1")
+        return (x, y)
+
+    def convert_coords_to_str(self, coords):
+        if not isinstance(coords, tuple):
+            raise CoordCoversionError("Coordinates must be a tuple")
+        if len(coords) != 2:
+            raise CoordCoversionError("Coordinates must be a tuple of length 2")
+        try:
+            x = coords[0] + 1
+            y = chr(coords[1] + ord("A"))
+        except CoordCoversionError:
+            raise CoordCoversionError("Coordinates must be in the format (0, 0)")
+        return f"{y}{x}"
@@ -0,0 +1,168 @@
+import numpy as np
+from .chessPieces import PIECE_VALUES
+from .encoding import PIECE_CODES, POSITION_BYTES
+
+#batches of positions are (N, 12) uint64 piece bitboards in encoding.PIECE_CODES order (bit n is square
+#row*8 + col) with an (N,) uint64 first move mask, or (N, 64)/(N, 8, 8) int8 arrays of PIECE_CODES codes
+#(0 is an empty square); scores are bit for bit what Player.get_heuristic gives
+NAMES = ("Pawn", "Knight", "Bishop", "Rook", "Queen", "King")
+VALUES = np.array([PIECE_VALUES[name] for name in NAMES], dtype=np.int64)
+#bigger batches are split so the temporaries stay in cache
+CHUNK = 2048
+
+def _columns(cols):
+    mask = 0
+    for row in range(8):
+        for col in cols:
+            mask |= 1 << (row*8 + col)
+    return np.uint64(mask)
+
+#squares a piece may step from or to without leaving the board sideways, by column change
+FROM_COLUMNS = {dc: _columns([col for col in range(8) if 0 <= col + dc < 8]) for dc in range(-2, 3)}
+TO_COLUMNS = {dc: _columns([col for col in range(8) if 0 <= col - dc < 8]) for dc in range(-2, 3)}
+KNIGHT_DELTAS = [(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)]
+KING_DELTAS = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]
+ROOK_DELTAS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+BISHOP_DELTAS = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+KINGSIDE_KINGS = _columns(range(5))
+QUEENSIDE_KINGS = _columns(range(4, 8))
+
+def _raw_shift(bitboards, n):
+    return bitboards << n if n > 0 else bitboards >> -n
+
+def shift(bitboards, delta):
+    #every piece moved by (rows, cols), pieces that would leave the board are dropped
+    return _raw_shift(bitboards & FROM_COLUMNS[delta[1]], delta[0]*8 + delta[1])
+
+def _unpacked_count(bitboards):
+    #set bits per uint64 from its unpacked bytes, for numpy before 2.0
+    bitboards = np.ascontiguousarray(bitboards, dtype="<u8")
+    bits = np.unpackbits(bitboards.view(np.uint8).reshape(bitboards.shape + (8,)), axis=-1)
+    return bits.sum(axis=-1, dtype=np.int64)
+
+def count(bitboards):
+    return np.bitwise_count(bitboards).astype(np.int64)
+
+#np.bitwise_count is new in numpy 2.0
+if not hasattr(np, "bitwise_count"):
+    count = _unpacked_count
+
+def slide(movers, empty, delta):
+    #squares the movers reach along delta: every empty square up to and including the first piece
+    #a square is only ever reached by the nearest mover behind it, so the count is the per-piece total
+    #kogge-stone fill: the movers spread 1, 2 then 4 squares over empty squares, a square in the
+    #column a step would wrap into is never empty so nothing crosses the board edge
+    n = delta[0]*8 + delta[1]
+    edge = TO_COLUMNS[delta[1]]
+    spread = empty & edge
+    fill = movers | spread & _raw_shift(movers, n)
+    spread &= _raw_shift(spread, n)
+    fill |= spread & _raw_shift(fill, 2*n)
+    spread &= _raw_shift(spread, 2*n)
+    fill |= spread & _raw_shift(fill, 4*n)
+    return _raw_shift(fill, n) & edge
+
+def mask_bits(masks):
+    #(N,) uint64 bitboards to (N, 64) bools
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    return np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little").astype(bool)
+
+def to_bitboards(squares):
+    #(N, 64) or (N, 8, 8) codes to (N, 12) piece bitboards
+    squares = np.asarray(squares, dtype=np.int8).reshape(-1, 64)
+    bits = squares[:, None, :] == np.arange(1, len(PIECE_CODES) + 1, dtype=np.int8)[None, :, None]
+    packed = np.packbits(bits, axis=2, bitorder="little")
+    return np.ascontiguousarray(packed).view("<u8").reshape(len(squares), len(PIECE_CODES)).astype(np.uint64)
+
+def to_squares(bitboards):
+    #(N, 12) piece bitboards to (N, 64) codes
+    bitboards = np.asarray(bitboards, dtype=np.uint64)
+    bits = mask_bits(bitboards.reshape(-1)).reshape(len(bitboards), len(PIECE_CODES), 64)
+    codes = np.arange(1, len(PIECE_CODES) + 1, dtype=np.int8)
+    return (bits * codes[None, :, None]).sum(axis=1, dtype=np.int8)
+
+def from_boards(boards):
+    #(bitboards, first move masks) for a list of Board or BitBoard
+    bitboards = np.array([board.piece_bitboards() for board in boards], dtype=np.uint64).reshape(-1, len(PIECE_CODES))
+    return bitboards, np.array([board.unmoved for board in boards], dtype=np.uint64)
+
+def decode_positions(data):
+    #(codes, first move masks) for concatenated encoding.encode_position records, e.g. a whole file
+    records = np.frombuffer(data, dtype=np.uint8).reshape(-1, POSITION_BYTES)
+    occupied = np.unpackbits(records[:, :8], axis=1, bitorder="little").astype(bool)
+    packed = records[:, 8:24]
+    nibbles = np.stack([packed & 15, packed >> 4], axis=2).reshape(len(records), 32)
+    #the k-th occupied square holds the k-th code
+    index = np.maximum(np.cumsum(occupied, axis=1) - 1, 0)
+    squares = np.where(occupied, np.take_along_axis(nibbles, index, axis=1), 0).astype(np.int8)
+    unmoved = np.ascontiguousarray(records[:, 24:32]).view("<u8").reshape(-1).astype(np.uint64)
+    return squares, unmoved
+
+def material(bitboards, color):
+    base = 0 if color == "white" else 6
+    return count(bitboards[:, base:base + 6]) @ VALUES
+
+def _mobility(own, enemy, unmoved):
+    #moves in action_space for the side whose (M, 6) piece bitboards are own, moving up the board like
+    #white: pseudo legal, castling only needs an unmoved king and rook with empty squares between them,
+    #the same as BitBoard.targets
+    pieces = dict(zip(NAMES, own.T))
+    occupied = np.bitwise_or.reduce(own, axis=1)
+    empty = ~(occupied | enemy)
+    free = ~occupied
+    total = np.zeros(len(own), dtype=np.int64)
+    #one delta moves every piece to a different square, so per delta the count is the per-piece total
+    for delta in KNIGHT_DELTAS:
+        total += count(shift(pieces["Knight"], delta) & free)
+    for delta in KING_DELTAS:
+        total += count(shift(pieces["King"], delta) & free)
+    for deltas, name in ((ROOK_DELTAS, "Rook"), (BISHOP_DELTAS, "Bishop")):
+        movers = pieces[name] | pieces["Queen"]
+        for delta in deltas:
+            total += count(slide(movers, empty, delta) & free)
+
+    pawns = pieces["Pawn"]
+    one = (pawns >> 8) & empty
+    two = (((pawns & unmoved) >> 8) & empty) >> 8 & empty
+    total += count(one) + count(two)
+    total += count(shift(pawns, (-1, 1)) & enemy) + count(shift(pawns, (-1, -1)) & enemy)
+
+    king, rooks = pieces["King"] & unmoved, pieces["Rook"] & unmoved
+    total += count(king & KINGSIDE_KINGS & (rooks >> 3) & (empty >> 1) & (empty >> 2))
+    total += count(king & QUEENSIDE_KINGS & (rooks << 4) & (empty << 1) & (empty << 2) & (empty << 3))
+    return total
+
+def mobilities(bitboards, unmoved):
+    #(white, black) mobility of every position, black's pieces are mirrored top to bottom (a byte swap)
+    #so both colors go through _mobility together as a side moving up the board
+    n = len(bitboards)
+    white, black = bitboards[:, :6], bitboards[:, 6:].byteswap()
+    own = np.concatenate([white, black])
+    enemy = np.concatenate([np.bitwise_or.reduce(black.byteswap(), axis=1), np.bitwise_or.reduce(white, axis=1).byteswap()])
+    total = _mobility(own, enemy, np.concatenate([unmoved, unmoved.byteswap()]))
+    return total[:n], total[n:]
+
+def mobility(bitboards, unmoved, color):
+    return mobilities(bitboards, unmoved)[0 if color == "white" else 1]
+
+def evaluate_bitboards(bitboards, unmoved, color, pawns=None):
+    #float64 scores from color's side, computed in the same order as Player.get_heuristic so they match exactly
+    #pawns are the players' pawn structure scores when that term is on, added to material like get_board_heuristic
+    bitboards = np.asarray(bitboards, dtype=np.uint64).reshape(-1, len(PIECE_CODES))
+    unmoved = np.asarray(unmoved, dtype=np.uint64)
+    if pawns is not None:
+        pawns = np.asarray(pawns, dtype=np.int64)
+    if len(bitboards) > CHUNK:
+        return np.concatenate([evaluate_bitboards(bitboards[i:i + CHUNK], unmoved[i:i + CHUNK], color,
+            None if pawns is None else pawns[i:i + CHUNK]) for i in range(0, len(bitboards), CHUNK)])
+    other = "white" if color == "black" else "black"
+    board = material(bitboards, color) - material(bitboards, other)
+    if pawns is not None:
+        board = board + pawns
+    white, black = mobilities(bitboards, unmoved)
+    own, enemy = (white, black) if color == "white" else (black, white)
+    return board + (own*0.1 - enemy*0.1)
+
+def evaluate(squares, unmoved, color):
+    #the same for (N, 64) or (N, 8, 8) code arrays
+    return evaluate_bitboards(to_bitboards(squares), unmoved, color)
@@ -0,0 +1,159 @@
+import numpy as np
+from .batch_eval import (shift, slide, count, mask_bits, KNIGHT_DELTAS, KING_DELTAS, ROOK_DELTAS, BISHOP_DELTAS,
+    KINGSIDE_KINGS, QUEENSIDE_KINGS)
+from .encoding import PIECE_CODES, PROMOTION, CASTLE
+
+#legal moves for a batch of positions given as (N, 12) piece bitboards and (N,) first move masks (see
+#batch_eval), returned as encoding.pack_move codes in one flat array with offsets[i]:offsets[i + 1]
+#holding position i's moves; the rules are BitBoard.iter_legal_moves: pawns promote to a queen, castling
+#needs an unmoved king and rook, empty squares between them and no check on the king's square or the one
+#it crosses, and a move may not leave the own king attacked
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+#the side to move is always turned into white, moving towards row 0, black is mirrored top to bottom
+#with a byte swap and its squares flipped back at the end
+MIRROR = 56
+#rook squares of make_move's castling on white's back row
+KINGSIDE_ROOK = (63, 61)
+QUEENSIDE_ROOK = (56, 59)
+
+#positions handled per pass, bigger batches are split so the temporaries stay in cache
+CHUNK = 2048
+
+def _lines():
+    #every square a queen on each square sees on an empty board, and nothing for square 64 (no king)
+    squares = np.uint64(1) << np.arange(64, dtype=np.uint64)
+    everything = np.full(64, ~np.uint64(0))
+    lines = np.zeros(65, dtype=np.uint64)
+    for delta in ROOK_DELTAS + BISHOP_DELTAS:
+        lines[:64] |= slide(squares, everything, delta)
+    return lines
+
+#a move can only expose the king if it starts on one of these lines from the king
+KING_LINES = _lines()
+
+def attacked(targets, enemy, empty):
+    #true where the square in targets (one bit or none) is attacked by the enemy's (M, 6) pieces, which
+    #move towards row 7
+    hits = np.zeros(len(targets), dtype=np.uint64)
+    for delta in KNIGHT_DELTAS:
+        hits |= shift(targets, delta) & enemy[:, KNIGHT]
+    for delta in KING_DELTAS:
+        hits |= shift(targets, delta) & enemy[:, KING]
+    hits |= (shift(targets, (-1, 1)) | shift(targets, (-1, -1))) & enemy[:, PAWN]
+    straight = enemy[:, ROOK] | enemy[:, QUEEN]
+    for delta in ROOK_DELTAS:
+        hits |= slide(targets, empty, delta) & straight
+    diagonal = enemy[:, BISHOP] | enemy[:, QUEEN]
+    for delta in BISHOP_DELTAS:
+        hits |= slide(targets, empty, delta) & diagonal
+    return hits != 0
+
+def pseudo_moves(own, enemy, unmoved):
+    #(position, from, to, piece, flags) arrays of every move in action_space for the white side own
+    #every group of targets shares its step, piece and flags, the set bits of all groups are read at once
+    own_occupied = np.bitwise_or.reduce(own, axis=1)
+    enemy_occupied = np.bitwise_or.reduce(enemy, axis=1)
+    empty = ~(own_occupied | enemy_occupied)
+    free = ~own_occupied
+    groups, steps, kinds, kind_flags = [], [], [], []
+
+    def add(targets, step, piece, flags=0):
+        groups.append(targets)
+        steps.append(step)
+        kinds.append(piece)
+        kind_flags.append(flags)
+
+    for piece, deltas in ((KNIGHT, KNIGHT_DELTAS), (KING, KING_DELTAS)):
+        for delta in deltas:
+            add(shift(own[:, piece], delta) & free, delta[0]*8 + delta[1], piece)
+    for piece, deltas in ((ROOK, ROOK_DELTAS), (BISHOP, BISHOP_DELTAS), (QUEEN, ROOK_DELTAS + BISHOP_DELTAS)):
+        for delta in deltas:
+            #k steps out along the ray, over empty squares only
+            reach = own[:, piece]
+            n = delta[0]*8 + delta[1]
+            for k in range(1, 8):
+                reach = shift(reach, delta)
+                if not reach.any():
+                    break
+                add(reach & free, k*n, piece)
+                reach &= empty
+
+    pawns = own[:, PAWN]
+    one = (pawns >> 8) & empty
+    two = (((pawns & unmoved) >> 8) & empty) >> 8 & empty
+    last_row = np.uint64(0xFF)
+    for targets, step in ((one, -8), (two, -16), (shift(pawns, (-1, 1)) & enemy_occupied, -7),
+            (shift(pawns, (-1, -1)) & enemy_occupied, -9)):
+        add(targets & ~last_row, step, PAWN)
+        add(targets & last_row, step, PAWN, PROMOTION)
+
+    king, rooks = own[:, KING] & unmoved, own[:, ROOK] & unmoved
+    add((king & KINGSIDE_KINGS & (rooks >> 3) & (empty >> 1) & (empty >> 2)) << 2, 2, KING, CASTLE)
+    add((king & QUEENSIDE_KINGS & (rooks << 4) & (empty << 1) & (empty << 2) & (empty << 3)) >> 2, -2, KING, CASTLE)
+    targets = np.stack(groups, axis=1).reshape(-1)
+    cells = np.flatnonzero(targets)
+    rows, ends = np.nonzero(mask_bits(targets[cells]))
+    cells = cells[rows]
+    positions, group = np.divmod(cells, len(groups))
+    return (positions, ends - np.array(steps)[group], ends, np.array(kinds)[group], np.array(kind_flags)[group])
+
+def legal_moves(bitboards, unmoved, color="white"):
+    #(moves, offsets) for every position, color is "white", "black" or an (N,) bool array, True where black moves
+    bitboards = np.asarray(bitboards, dtype=np.uint64).reshape(-1, len(PIECE_CODES))
+    unmoved = np.asarray(unmoved, dtype=np.uint64)
+    n = len(bitboards)
+    black = np.full(n, color == "black") if isinstance(color, str) else np.asarray(color, dtype=bool)
+    if n > CHUNK:
+        parts = [_legal_moves(bitboards[i:i + CHUNK], unmoved[i:i + CHUNK], black[i:i + CHUNK]) for i in range(0, n, CHUNK)]
+        counts = np.concatenate([np.diff(offsets) for _, offsets in parts])
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return np.concatenate([moves for moves, _ in parts]), offsets
+    return _legal_moves(bitboards, unmoved, black)
+
+def _legal_moves(bitboards, unmoved, black):
+    n = len(bitboards)
+    white_pieces, black_pieces = bitboards[:, :6], bitboards[:, 6:]
+    own = np.where(black[:, None], black_pieces.byteswap(), white_pieces)
+    enemy = np.where(black[:, None], white_pieces.byteswap(), black_pieces)
+    unmoved = np.where(black, unmoved.byteswap(), unmoved)
+
+    positions, starts, ends, pieces, flags = pseudo_moves(own, enemy, unmoved)
+    #make every move on its own row: the own pieces only block, so their occupancy is enough
+    one = np.uint64(1)
+    start_bits, end_bits = one << starts.astype(np.uint64), one << ends.astype(np.uint64)
+    own_occupied = np.bitwise_or.reduce(own, axis=1)
+    castles = flags == CASTLE
+    rook_bits = np.where(ends > starts, np.uint64((1 << KINGSIDE_ROOK[0]) | (1 << KINGSIDE_ROOK[1])),
+        np.uint64((1 << QUEENSIDE_ROOK[0]) | (1 << QUEENSIDE_ROOK[1])))
+    occupied_after = own_occupied[positions] ^ start_bits | end_bits
+    occupied_after ^= np.where(castles, rook_bits, np.uint64(0))
+    enemy_after = enemy[positions] & ~end_bits[:, None]
+    occupied_after |= np.bitwise_or.reduce(enemy_after, axis=1)
+    kings = np.where(pieces == KING, end_bits, own[positions, KING])
+    #only king moves, moves out of check and moves off a line through the king need the full test
+    own_kings = own[:, KING]
+    in_check = attacked(own_kings, enemy, ~(own_occupied | np.bitwise_or.reduce(enemy, axis=1)))
+    lines = KING_LINES[count(own_kings - np.uint64(1))]
+    suspects = np.flatnonzero((pieces == KING) | in_check[positions] | (lines[positions] & start_bits != 0))
+    illegal = np.zeros(len(positions), dtype=bool)
+    illegal[suspects] = attacked(kings[suspects], enemy_after[suspects], ~occupied_after[suspects])
+    if castles.any():
+        #no castling out of or through check
+        rows = np.flatnonzero(castles)
+        before = enemy[positions[rows]]
+        empty_before = ~(own_occupied[positions[rows]] | np.bitwise_or.reduce(before, axis=1))
+        crossed = one << ((starts[rows] + ends[rows]) // 2).astype(np.uint64)
+        illegal[rows] |= attacked(start_bits[rows], before, empty_before) | attacked(crossed, before, empty_before)
+
+    legal = ~illegal
+    positions, starts, ends, flags = positions[legal], starts[legal], ends[legal], flags[legal]
+    flip = np.where(black[positions], MIRROR, 0)
+    moves = ((starts ^ flip) | (ends ^ flip) << 6 | flags).astype(np.uint16)
+    #pseudo_moves lists the moves position by position already
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(positions, minlength=n), out=offsets[1:])
+    return moves, offsets
+
+def move_counts(bitboards, unmoved, color="white"):
+    return np.diff(legal_moves(bitboards, unmoved, color)[1])
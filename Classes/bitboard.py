@@ -0,0 +1,440 @@
+from .chessPieces import *
+from .base_board import BaseBoard, InvalidCoordError, ParsePieceError
+from .zobrist import PIECE_KEYS, FIRST_MOVE_KEYS, SIDE_KEY
+from .move_tables import SQUARE_MOVES
+
+#squares are numbered row*8 + col, bit n of a bitboard is square n
+COLORS = ("white", "black")
+NAMES = ("Pawn", "Knight", "Bishop", "Rook", "Queen", "King")
+SYMBOL_NAMES = {"P": "Pawn", "N": "Knight", "B": "Bishop", "R": "Rook", "Q": "Queen", "K": "King"}
+PIECE_CLASSES = {"Pawn": Pawn, "Knight": Knight, "Bishop": Bishop, "Rook": Rook, "Queen": Queen, "King": King}
+VALUES = PIECE_VALUES
+
+def _on_board(row, col):
+    return 0 <= row < 8 and 0 <= col < 8
+
+def _step_mask(sq, deltas):
+    mask = 0
+    for dr, dc in deltas:
+        row, col = sq // 8 + dr, sq % 8 + dc
+        if _on_board(row, col):
+            mask |= 1 << (row*8 + col)
+    return mask
+
+def _ray_mask(sq, delta):
+    mask = 0
+    row, col = sq // 8 + delta[0], sq % 8 + delta[1]
+    while _on_board(row, col):
+        mask |= 1 << (row*8 + col)
+        row, col = row + delta[0], col + delta[1]
+    return mask
+
+KNIGHT_ATTACKS = [_step_mask(sq, [(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)]) for sq in range(64)]
+KING_ATTACKS = [_step_mask(sq, [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]) for sq in range(64)]
+#squares a pawn of the given color on sq attacks (white moves towards row 0)
+PAWN_ATTACKS = {
+    "white": [_step_mask(sq, [(-1, 1), (-1, -1)]) for sq in range(64)],
+    "black": [_step_mask(sq, [(1, 1), (1, -1)]) for sq in range(64)],
+}
+PAWN_STEP = {"white": -8, "black": 8}
+PROMOTION_ROWS = 0xFF | (0xFF << 56)
+FULL = (1 << 64) - 1
+
+#(ray table, positive) per direction, positive rays find their first blocker at the lowest bit
+ROOK_RAYS = [([_ray_mask(sq, d) for sq in range(64)], d[0] > 0 or (d[0] == 0 and d[1] > 0)) for d in [(0, 1), (0, -1), (1, 0), (-1, 0)]]
+BISHOP_RAYS = [([_ray_mask(sq, d) for sq in range(64)], d[0] > 0) for d in [(1, 1), (-1, 1), (1, -1), (-1, -1)]]
+
+def slider_attacks(sq, occupied, rays):
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            if positive:
+                first = (blockers & -blockers).bit_length() - 1
+            else:
+                first = blockers.bit_length() - 1
+            ray ^= table[first]
+        attacks |= ray
+    return attacks
+
+def iter_bits(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+class BitBoard(BaseBoard):
+    #same interface as Board, position is kept as twelve piece bitboards plus occupancy masks
+    def __init__(self, init_board_repr:list[list[str]]):
+        self.pieces = {color: {name: 0 for name in NAMES} for color in COLORS}
+        self.occupancy = {color: 0 for color in COLORS}
+        #pawns, rooks and kings that have not moved yet, same as Board.unmoved
+        self.unmoved = 0
+        self.parse_board(init_board_repr)
+        #zobrist key, same keys as Board so both engines hash a position identically
+        self.hash = self.compute_hash()
+        #sum of piece values per color, kept up to date by make_move/unmake_move
+        self.material_score = {color: self.compute_material(color) for color in COLORS}
+
+    @property
+    def size(self):
+        return (8, 8)
+
+    @property
+    def n_rows(self):
+        return 8
+
+    @property
+    def n_cols(self):
+        return 8
+
+    @property
+    def occupied(self):
+        return self.occupancy["white"] | self.occupancy["black"]
+
+    def copy(self):
+        board = BitBoard.__new__(BitBoard)
+        board.pieces = {color: dict(self.pieces[color]) for color in COLORS}
+        board.occupancy = dict(self.occupancy)
+        board.unmoved = self.unmoved
+        board.hash = self.hash
+        board.material_score = dict(self.material_score)
+        return board
+
+    def compute_hash(self):
+        h = 0
+        for color in COLORS:
+            for name in NAMES:
+                for sq in iter_bits(self.pieces[color][name]):
+                    h ^= PIECE_KEYS[(color, name)][sq]
+        for sq in iter_bits(self.unmoved):
+            h ^= FIRST_MOVE_KEYS[sq]
+        return h
+
+    def parse_board(self, board_repr:list[list[str]]):
+        if len(board_repr) != 8 or any(len(row) != 8 for row in board_repr):
+            raise InvalidCoordError("BitBoard only supports 8x8 boards")
+        for row in range(8):
+            for col in range(8):
+                piece = board_repr[row][col]
+                if piece == "__":
+                    continue
+                color = "white" if piece[0] == "w" else "black"
+                if piece[1] not in SYMBOL_NAMES:
+                    raise ParsePieceError(f"Invalid piece name: {piece[1]}")
+                name = SYMBOL_NAMES[piece[1]]
+                bit = 1 << (row*8 + col)
+                self.pieces[color][name] |= bit
+                self.occupancy[color] |= bit
+                if name in ("Pawn", "Rook", "King"):
+                    self.unmoved |= bit
+
+    def piece_at(self, sq):
+        #(color, name) of the piece on square sq, or None
+        bit = 1 << sq
+        for color in COLORS:
+            if self.occupancy[color] & bit:
+                for name in NAMES:
+                    if self.pieces[color][name] & bit:
+                        return color, name
+        return None
+
+    def piece_info(self, position):
+        #(color, name) of the piece on position, or None, without building a Piece
+        return self.piece_at(position[0]*8 + position[1])
+
+    def targets(self, sq, color, name):
+        #bitboard of squares the piece on sq can move to
+        own = self.occupancy[color]
+        if name == "Knight":
+            return KNIGHT_ATTACKS[sq] & ~own
+        if name == "Bishop":
+            return slider_attacks(sq, self.occupied, BISHOP_RAYS) & ~own
+        if name == "Rook":
+            return slider_attacks(sq, self.occupied, ROOK_RAYS) & ~own
+        if name == "Queen":
+            occupied = self.occupied
+            return (slider_attacks(sq, occupied, ROOK_RAYS) | slider_attacks(sq, occupied, BISHOP_RAYS)) & ~own
+        if name == "Pawn":
+            return self.pawn_targets(sq, color)
+        return self.king_targets(sq, color)
+
+    def pawn_targets(self, sq, color):
+        enemy = "black" if color == "white" else "white"
+        occupied = self.occupied
+        targets = PAWN_ATTACKS[color][sq] & self.occupancy[enemy]
+        step = PAWN_STEP[color]
+        one = sq + step
+        if 0 <= one < 64 and not occupied & (1 << one):
+            targets |= 1 << one
+            two = one + step
+            if self.unmoved & (1 << sq) and 0 <= two < 64 and not occupied & (1 << two):
+                targets |= 1 << two
+        return targets
+
+    def king_targets(self, sq, color):
+        targets = KING_ATTACKS[sq] & ~self.occupancy[color]
+        if self.unmoved & (1 << sq):
+            occupied = self.occupied
+            rooks = self.pieces[color]["Rook"] & self.unmoved
+            col = sq % 8
+            #rook sits in the corner, every square between it and the king must be empty
+            if col + 3 < 8 and rooks & (1 << (sq + 3)) and not occupied & (0b11 << (sq + 1)):
+                targets |= 1 << (sq + 2)
+            if col - 4 >= 0 and rooks & (1 << (sq - 4)) and not occupied & (0b111 << (sq - 3)):
+                targets |= 1 << (sq - 2)
+        return targets
+
+    def action_space(self, color, noisy=True, quiet=True):
+        #noisy moves are captures and pawn pushes onto the last row, quiet moves are the rest
+        enemy = self.occupancy["black" if color == "white" else "white"]
+        actions = []
+        for name in NAMES:
+            noisy_mask = enemy | PROMOTION_ROWS if name == "Pawn" else enemy
+            mask = FULL if noisy and quiet else noisy_mask if noisy else ~noisy_mask if quiet else 0
+            for sq in iter_bits(self.pieces[color][name]):
+                moves = SQUARE_MOVES[sq]
+                for target in iter_bits(self.targets(sq, color, name) & mask):
+                    actions.append(moves[target])
+        return actions
+
+    def mobility(self, color):
+        #number of moves in action_space(color) without building the list
+        count = 0
+        for name in NAMES:
+            for sq in iter_bits(self.pieces[color][name]):
+                count += self.targets(sq, color, name).bit_count()
+        return count
+
+    def compute_material(self, color):
+        pieces = self.pieces[color]
+        return sum(VALUES[name]*pieces[name].bit_count() for name in NAMES)
+
+    def state_space(self, turn_color):
+        state_space = []
+        for action in self.action_space(turn_color):
+            board_copy = self.copy()
+            board_copy.make_move(action[0], action[1])
+            state_space.append(board_copy)
+        return state_space
+
+    def move_valid(self, start, end, turn_color, verbose=False):
+        def _print(msg):
+            if verbose:
+                print(msg)
+
+        if not self.coords_valid(start) or not self.coords_valid(end):
+            raise InvalidCoordError("Invalid coordinates")
+        if start == end:
+            _print(f"piece cannot stay in the same position {start}")
+            return False
+        sq = start[0]*8 + start[1]
+        piece = self.piece_at(sq)
+        if piece is None:
+            _print(f"No piece at start position {start}")
+            return False
+        color, name = piece
+        if turn_color != color:
+            _print(f"Cannot move opponent's piece {self.get_piece(start)} at {start}")
+            return False
+        if not self.targets(sq, color, name) & (1 << (end[0]*8 + end[1])):
+            _print(f"piece cannot move to end position {end}")
+            return False
+        return True
+
+    def make_move(self, start, end):
+        #apply a move without validating it, returns an undo record for unmake_move
+        #record: (start_sq, end_sq, color, name, captured, unmoved, promoted, castle, hash)
+        s, e = start[0]*8 + start[1], end[0]*8 + end[1]
+        color, name = self.piece_at(s)
+        captured = self.piece_at(e)
+        record_unmoved, record_hash = self.unmoved, self.hash
+        start_bit, end_bit = 1 << s, 1 << e
+        h = record_hash ^ SIDE_KEY ^ PIECE_KEYS[(color, name)][s]
+        if captured is not None:
+            self.pieces[captured[0]][captured[1]] ^= end_bit
+            self.occupancy[captured[0]] ^= end_bit
+            h ^= PIECE_KEYS[captured][e]
+            self.material_score[captured[0]] -= VALUES[captured[1]]
+        own = self.pieces[color]
+        own[name] ^= start_bit | end_bit
+        self.occupancy[color] ^= start_bit | end_bit
+        self.unmoved &= ~(start_bit | end_bit)
+        promoted, castle = False, None
+        if name == "Pawn" and (end[0] == 0 or end[0] == 7):
+            own["Pawn"] ^= end_bit
+            own["Queen"] ^= end_bit
+            promoted = True
+            self.material_score[color] += VALUES["Queen"] - VALUES["Pawn"]
+        h ^= PIECE_KEYS[(color, "Queen" if promoted else name)][e]
+        if name == "King" and e - s in (2, -2):
+            row = 7 if color == "white" else 0
+            if e > s:
+                rook_start, rook_end = row*8 + 7, row*8 + 5
+            else:
+                rook_start, rook_end = row*8, row*8 + 3
+            rook_bits = (1 << rook_start) | (1 << rook_end)
+            own["Rook"] ^= rook_bits
+            self.occupancy[color] ^= rook_bits
+            #the rook keeps its first_move flag when it is castled, like Board.castle
+            if record_unmoved & (1 << rook_start):
+                self.unmoved ^= rook_bits
+            castle = (rook_start, rook_end)
+            h ^= PIECE_KEYS[(color, "Rook")][rook_start] ^ PIECE_KEYS[(color, "Rook")][rook_end]
+        for sq in iter_bits(record_unmoved ^ self.unmoved):
+            h ^= FIRST_MOVE_KEYS[sq]
+        self.hash = h
+        return (s, e, color, name, captured, record_unmoved, promoted, castle, record_hash)
+
+    def unmake_move(self, record):
+        #restore the board to the state before make_move returned record
+        s, e, color, name, captured, unmoved, promoted, castle, record_hash = record
+        start_bit, end_bit = 1 << s, 1 << e
+        own = self.pieces[color]
+        if castle is not None:
+            rook_bits = (1 << castle[0]) | (1 << castle[1])
+            own["Rook"] ^= rook_bits
+            self.occupancy[color] ^= rook_bits
+        if promoted:
+            own["Queen"] ^= end_bit
+            own["Pawn"] ^= end_bit
+            self.material_score[color] -= VALUES["Queen"] - VALUES["Pawn"]
+        own[name] ^= start_bit | end_bit
+        self.occupancy[color] ^= start_bit | end_bit
+        if captured is not None:
+            self.pieces[captured[0]][captured[1]] |= end_bit
+            self.occupancy[captured[0]] |= end_bit
+            self.material_score[captured[0]] += VALUES[captured[1]]
+        self.unmoved = unmoved
+        self.hash = record_hash
+
+    def piece_bitboards(self):
+        #one bitboard per (color, name), white pawn first and black king last like encoding.PIECE_CODES
+        return [self.pieces[color][name] for color in COLORS for name in NAMES]
+
+    def pawn_key(self):
+        #(white pawns, black pawns) bitboards, the key of the pawn structure table
+        return self.pieces["white"]["Pawn"], self.pieces["black"]["Pawn"]
+
+    def has_pieces(self, color):
+        #color has something besides pawns and its king
+        pieces = self.pieces[color]
+        return bool(pieces["Knight"] | pieces["Bishop"] | pieces["Rook"] | pieces["Queen"])
+
+    def iter_legal_moves(self, color, noisy=True, quiet=True):
+        #moves that do not leave color's king in check, filtered with make/unmake since both are a few bit operations
+        #noisy/quiet pick captures and promotions, the other moves, or both
+        king = self.pieces[color]["King"]
+        if not king:
+            yield from self.action_space(color, noisy, quiet)
+            return
+        enemy = "black" if color == "white" else "white"
+        king_sq = king.bit_length() - 1
+        in_check = self.attacked(king_sq, enemy)
+        for action in self.action_space(color, noisy, quiet):
+            if self.king_safe_after(action, color, king_sq, in_check):
+                yield action
+
+    def king_safe_after(self, action, color, king_sq, in_check):
+        start, end = action
+        enemy = "black" if color == "white" else "white"
+        if start[0]*8 + start[1] == king_sq and abs(end[1] - start[1]) == 2:
+            #no castling out of or through check
+            if in_check or self.attacked((king_sq + start[0]*8 + end[1]) // 2, enemy):
+                return False
+        record = self.make_move(start, end)
+        safe = not self.in_check(color)
+        self.unmake_move(record)
+        return safe
+
+    def is_legal(self, move, color):
+        #single move check, used for moves remembered from other positions (hash and killer moves)
+        start, end = move
+        if not self.coords_valid(start) or not self.coords_valid(end):
+            return False
+        sq = start[0]*8 + start[1]
+        piece = self.piece_at(sq)
+        if piece is None or piece[0] != color or not self.targets(sq, color, piece[1]) & (1 << (end[0]*8 + end[1])):
+            return False
+        king = self.pieces[color]["King"]
+        if not king:
+            return True
+        king_sq = king.bit_length() - 1
+        return self.king_safe_after(move, color, king_sq, self.attacked(king_sq, "black" if color == "white" else "white"))
+
+    def is_square_attacked(self, square, by_color):
+        return self.attacked(square[0]*8 + square[1], by_color)
+
+    def attacked(self, sq, by_color):
+        #true if any piece of by_color attacks square sq
+        enemy = self.pieces[by_color]
+        color = "black" if by_color == "white" else "white"
+        if KNIGHT_ATTACKS[sq] & enemy["Knight"]:
+            return True
+        if KING_ATTACKS[sq] & enemy["King"]:
+            return True
+        if PAWN_ATTACKS[color][sq] & enemy["Pawn"]:
+            return True
+        occupied = self.occupied
+        if slider_attacks(sq, occupied, ROOK_RAYS) & (enemy["Rook"] | enemy["Queen"]):
+            return True
+        if slider_attacks(sq, occupied, BISHOP_RAYS) & (enemy["Bishop"] | enemy["Queen"]):
+            return True
+        return False
+
+    def in_check(self, color):
+        king = self.pieces[color]["King"]
+        if not king:
+            return False
+        enemy = "black" if color == "white" else "white"
+        return self.attacked(king.bit_length() - 1, enemy)
+
+    def get_king_pos(self, color):
+        king = self.pieces[color]["King"]
+        if not king:
+            return None
+        sq = (king & -king).bit_length() - 1
+        return (sq // 8, sq % 8)
+
+    def get_piece(self, position):
+        sq = position[0]*8 + position[1]
+        piece = self.piece_at(sq)
+        if piece is None:
+            return None
+        color, name = piece
+        return PIECE_CLASSES[name](color, position)
+
+    def get_pieces(self):
+        pieces = []
+        for row in range(8):
+            for col in range(8):
+                piece = self.get_piece((row, col))
+                if piece is not None:
+                    pieces.append(piece)
+        return pieces
+
+    def coords_valid(self, position):
+        return 0 <= position[0] < 8 and 0 <= position[1] < 8
+
+    def symbol_at(self, sq):
+        piece = self.piece_at(sq)
+        if piece is None:
+            return None
+        color, name = piece
+        symbol = "N" if name == "Knight" else name[0]
+        return ("w" if color == "white" else "b") + symbol
+
+    def get_board_repr(self):
+        return "".join(self.symbol_at(sq) or "__" for sq in range(64))
+
+    def __str__(self):
+        repr = ""
+        for row in range(8):
+            repr += str(row + 1) + "  "
+            for col in range(8):
+                symbol = self.symbol_at(row*8 + col)
+                repr += " .  " if symbol is None else symbol + "  "
+            repr += "\n"
+        repr += "    A   B   C   D   E   F   G   H\n"
+        return repr
@@ -1,18 +1,36 @@
 from .chessPieces import *
+from .zobrist import piece_hash, hash_board, SIDE_KEY, FIRST_MOVE_KEYS, COLORS, NAMES
+from .move_tables import KNIGHT_TARGETS, KING_TARGETS, RAYS, PAWN_CAPTURES
+from .base_board import BaseBoard, InvalidCoordError, ParsePieceError, CoordCoversionError
 from copy import deepcopy
 
-class InvalidCoordError(Exception):
-    pass
+ROOK_ATTACKERS = ("Rook", "Queen")
+#pieces whose first move matters: pawn double push, castling
+FIRST_MOVE_NAMES = ("Pawn", "Rook", "King")
+BISHOP_ATTACKERS = ("Bishop", "Queen")
 
-class ParsePieceError(Exception):
-    pass
-
-class CoordCoversionError(Exception):
-    pass
-
-class Board:
+class Board(BaseBoard):
     def __init__(self, init_board_repr:list[list[str]]):
         self.board = self.parse_board(init_board_repr)
+        #pieces of each color by position and king squares, kept up to date by set_piece/remove_piece
+        self.pieces_by_color = {"white": {}, "black": {}}
+        self.king_pos = {"white": None, "black": None}
+        #bit row*8 + col is set while the pawn, rook or king on that square has not moved
+        self.unmoved = 0
+        for row in self.board:
+            for piece in row:
+                if piece is not None:
+                    self.pieces_by_color[piece.color][piece.position] = piece
+                    if piece.name == "King" and self.king_pos[piece.color] is None:
+                        self.king_pos[piece.color] = piece.position
+                    if piece.name in FIRST_MOVE_NAMES:
+                        self.unmoved |= 1 << (piece.position[0]*8 + piece.position[1])
+        #zobrist key, kept up to date by set_piece/remove_piece and make_move
+        self.hash = hash_board(self)
+        #sum of piece values per color, kept up to date by set_piece/remove_piece
+        self.material_score = {"white": 0, "black": 0}
+        for piece in self.get_pieces():
+            self.material_score[piece.color] += piece.value
 
     @property
     def size(self):
@@ -31,14 +49,13 @@ class Board:
 
     def action_space(self, color):
         actions = []
-        for i in range(self.n_rows):
-            for j in range(self.n_cols):
-                piece = self.get_piece((i, j))
-                if piece is not None and piece.color == color:
-                    for move in piece.get_possible_moves(self):
-                        actions.append(move)
+        for piece in list(self.pieces_by_color[color].values()):
+            actions.extend(piece.get_possible_moves(self))
         return actions
 
+    def mobility(self, color):
+        return len(self.action_space(color))
+
     def state_space(self, turn_color):
         action_space = self.action_space(turn_color)
         state_space = []
@@ -73,35 +90,156 @@ class Board:
         else:
             raise ParsePieceError(f"Invalid piece name: {name}")
     
-    def move_piece(self, start, end, turn_color, verbose=False):
-        def _print(msg):
-            if verbose:
-                print(msg)
+    def make_move(self, start, end):
+        #apply a move without validating it, returns an undo record for unmake_move
+        #record: (start, end, piece, captured, unmoved, hash, promotion, castle)
+        piece = self.get_piece(start)
+        captured = self.get_piece(end)
+        unmoved, record_hash = self.unmoved, self.hash
+        self.remove_piece(start)
+        self.set_piece(end, piece)
+        #whatever was on start or end has now moved or been captured
+        self.unmoved &= ~(1 << (start[0]*8 + start[1]) | 1 << (end[0]*8 + end[1]))
+        promotion, castle = None, None
+        if piece.name == "Pawn":
+            promotion = self.attempt_promotion(end)
+        if piece.name == "King":
+            castle = self.attempt_castle(piece, start, end)
+        changed = unmoved ^ self.unmoved
+        while changed:
+            low = changed & -changed
+            self.hash ^= FIRST_MOVE_KEYS[low.bit_length() - 1]
+            changed ^= low
+        self.hash ^= SIDE_KEY
+        return (start, end, piece, captured, unmoved, record_hash, promotion, castle)
 
-        if self.move_valid(start, end, turn_color, verbose=verbose):
-            piece = self.get_piece(start)
-            if piece.name in ["Pawn", "King", "Rook"]:
-                if piece.first_move:
-                    piece.first_move = False
-                    if piece.name == "Pawn":
-                        del piece.deltas[1]
-            self.set_piece(end, piece)
-            self.remove_piece(start)
-            if piece.name == "Pawn":
-                self.attempt_promotion(end)
-            if piece.name == "King":
-                self.attempt_castle(piece, start, end)    
-            return True
-        _print("Invalid move")
-        return False
+    def unmake_move(self, record):
+        #restore the board to the state before make_move returned record
+        start, end, piece, captured, unmoved, record_hash, promotion, castle = record
+        if castle is not None:
+            rook_start, rook_end, rook = castle
+            self.remove_piece(rook_end)
+            self.set_piece(rook_start, rook)
+        self.remove_piece(end)
+        self.set_piece(start, piece)
+        self.set_piece(end, captured)
+        self.unmoved = unmoved
+        self.hash = record_hash
+
+    def piece_bitboards(self):
+        #one bitboard per (color, name), white pawn first and black king last like encoding.PIECE_CODES
+        bitboards = {(color, name): 0 for color in COLORS for name in NAMES}
+        for color, pieces in self.pieces_by_color.items():
+            for (row, col), piece in pieces.items():
+                bitboards[(color, piece.name)] |= 1 << (row*8 + col)
+        return list(bitboards.values())
+
+    def pawn_key(self):
+        #(white pawns, black pawns) bitboards, the key of the pawn structure table
+        pawns = {"white": 0, "black": 0}
+        for color, pieces in self.pieces_by_color.items():
+            for (row, col), piece in pieces.items():
+                if piece.name == "Pawn":
+                    pawns[color] |= 1 << (row*8 + col)
+        return pawns["white"], pawns["black"]
+
+    def has_pieces(self, color):
+        #color has something besides pawns and its king
+        return any(piece.name not in ("Pawn", "King") for piece in self.pieces_by_color[color].values())
+
+    def iter_legal_moves(self, color, noisy=True, quiet=True):
+        #moves that do not leave color's king in check, checkers and pins are found once per position
+        #noisy/quiet pick captures and promotions, the other moves, or both
+        king_pos = self.king_pos[color]
+        if king_pos is None:
+            for piece in list(self.pieces_by_color[color].values()):
+                yield from piece.get_possible_moves(self, noisy, quiet)
+            return
+        enemy = "white" if color == "black" else "black"
+        checkers, block, pins = self.checkers_and_pins(king_pos, color)
+
+        #king moves, tested with the king lifted off the board so sliders see through its square
+        king = self.get_piece(king_pos)
+        king_moves = []
+        self.board[king_pos[0]][king_pos[1]] = None
+        for move in king.get_possible_moves(self, noisy, quiet):
+            end = move[1]
+            if self.is_square_attacked(end, enemy):
+                continue
+            if abs(end[1] - king_pos[1]) == 2:
+                #no castling out of or through check
+                passed = (king_pos[0], (king_pos[1] + end[1]) // 2)
+                if checkers or self.is_square_attacked(passed, enemy):
+                    continue
+            king_moves.append(move)
+        self.board[king_pos[0]][king_pos[1]] = king
+        yield from king_moves
+
+        #in double check only the king can move
+        if len(checkers) > 1:
+            return
+        for position, piece in list(self.pieces_by_color[color].items()):
+            if piece is king:
+                continue
+            pin = pins.get(position)
+            for move in piece.get_possible_moves(self, noisy, quiet):
+                if checkers and move[1] not in block:
+                    continue
+                if pin is not None and move[1] not in pin:
+                    continue
+                yield move
+
+    def is_legal(self, move, color):
+        #single move check, used for moves remembered from other positions (hash and killer moves)
+        start, end = move
+        if not self.coords_valid(start) or not self.coords_valid(end):
+            return False
+        piece = self.get_piece(start)
+        if piece is None or piece.color != color or move not in piece.get_possible_moves(self):
+            return False
+        enemy = "white" if color == "black" else "black"
+        if piece.name == "King" and abs(end[1] - start[1]) == 2:
+            if self.in_check(color) or self.is_square_attacked((start[0], (start[1] + end[1]) // 2), enemy):
+                return False
+        record = self.make_move(start, end)
+        legal = not self.in_check(color)
+        self.unmake_move(record)
+        return legal
+
+    def checkers_and_pins(self, king_pos, color):
+        #enemy pieces giving check, the squares that stop a single check,
+        #and for each pinned piece the line it may still move along
+        enemy = "white" if color == "black" else "black"
+        checkers, block, pins = [], set(), {}
+        for name, targets in (("Knight", KNIGHT_TARGETS[king_pos]), ("Pawn", PAWN_CAPTURES[color][king_pos]), ("King", KING_TARGETS[king_pos])):
+            for position in targets:
+                piece = self.board[position[0]][position[1]]
+                if piece is not None and piece.color == enemy and piece.name == name:
+                    checkers.append(position)
+                    block.add(position)
+        for delta, ray in RAYS[king_pos].items():
+            sliders = ROOK_ATTACKERS if delta[0] == 0 or delta[1] == 0 else BISHOP_ATTACKERS
+            pinned = None
+            for i, position in enumerate(ray):
+                piece = self.board[position[0]][position[1]]
+                if piece is None:
+                    continue
+                if piece.color == color:
+                    if pinned is not None:
+                        break
+                    pinned = position
+                    continue
+                if piece.name in sliders:
+                    if pinned is None:
+                        checkers.append(position)
+                        block.update(ray[:i + 1])
+                    else:
+                        pins[pinned] = set(ray[:i + 1])
+                break
+        return checkers, block, pins
 
     def get_pieces(self):
-        pieces = []
-        for row in self.board:
-            for piece in row:
-                if piece is not None:
-                    pieces.append(piece)
-        return pieces
+        return list(self.pieces_by_color["white"].values()) + list(self.pieces_by_color["black"].values())
 
     def move_valid(self, start, end, turn_color, verbose=False):
         def _print(msg):
@@ -127,99 +265,111 @@ class Board:
     
     def in_check(self, color):
         king_pos = self.get_king_pos(color)
-        #when king is found, check if any enemy piece can move to that position
-        for i in range(self.n_rows):
-            for j in range(self.n_cols):
-                if self.board[i][j] is not None and self.board[i][j].color != color:
-                    if self.board[i][j].move_valid((i, j), king_pos, self):
+        if king_pos is None:
+            return False
+        enemy = "white" if color == "black" else "black"
+        return self.is_square_attacked(king_pos, enemy)
+
+    def is_square_attacked(self, square, by_color):
+        #look outwards from square for a piece of by_color that could capture on it
+        for position in KNIGHT_TARGETS[square]:
+            piece = self.board[position[0]][position[1]]
+            if piece is not None and piece.color == by_color and piece.name == "Knight":
+                return True
+        for position in KING_TARGETS[square]:
+            piece = self.board[position[0]][position[1]]
+            if piece is not None and piece.color == by_color and piece.name == "King":
+                return True
+        #a by_color pawn attacks square from where a pawn of the other color on square would capture
+        defender = "white" if by_color == "black" else "black"
+        for position in PAWN_CAPTURES[defender][square]:
+            piece = self.board[position[0]][position[1]]
+            if piece is not None and piece.color == by_color and piece.name == "Pawn":
+                return True
+        for delta, ray in RAYS[square].items():
+            sliders = ROOK_ATTACKERS if delta[0] == 0 or delta[1] == 0 else BISHOP_ATTACKERS
+            for position in ray:
+                piece = self.board[position[0]][position[1]]
+                if piece is not None:
+                    if piece.color == by_color and piece.name in sliders:
                         return True
+                    break
         return False
     
     def get_king_pos(self, color):
-        #go through board to find position of king
-        for i in range(self.n_rows):
-            for j in range(self.n_cols):
-                if self.board[i][j] is not None and self.board[i][j].name == "King" and self.board[i][j].color == color:
-                    return (i, j)
-        return None
+        return self.king_pos[color]
 
     def attempt_promotion(self, position):
         piece = self.get_piece(position)
         if position[0] == 0 or position[0] == 7:
             self.remove_piece(position)
             self.set_piece(position, Queen(piece.color, position))
+            return piece
+        return None
         
     def attempt_castle(self, piece, start, end):
         delta = (end[0] - start[0], end[1] - start[1])
         if delta in piece.castle_deltas:
-            self.castle(piece, delta)
-            piece.deltas = piece.deltas[:-2]
+            return self.castle(piece, delta)
+        return None
             
     def castle(self, piece, delta):
-        if piece.color == "white":
-            rook = self.get_piece((7, 7)) if delta[1] > 0 else self.get_piece((7,0))
-            if delta[1] == -2:
-                self.remove_piece((7, 0))
-                self.set_piece((7, 3), rook)
-            else:
-                self.remove_piece((7, 7))
-                self.set_piece((7, 5), rook)
+        #move the rook next to the king, returns (rook_start, rook_end, rook)
+        row = 7 if piece.color == "white" else 0
+        if delta[1] == -2:
+            rook_start, rook_end = (row, 0), (row, 3)
         else:
-            rook = self.get_piece((0, 7)) if delta[1] > 0 else self.get_piece((0,0))
-            if delta[1] == -2:
-                self.remove_piece((0, 0))
-                self.set_piece((0, 3), rook)
-            else:
-                self.remove_piece((0, 7))
-                self.set_piece((0, 5), rook)
+            rook_start, rook_end = (row, 7), (row, 5)
+        rook = self.get_piece(rook_start)
+        self.remove_piece(rook_start)
+        self.set_piece(rook_end, rook)
+        #the rook keeps its first move flag on its new square, the king has lost castling anyway
+        rook_bit = 1 << (rook_start[0]*8 + rook_start[1])
+        if self.unmoved & rook_bit:
+            self.unmoved ^= rook_bit | 1 << (rook_end[0]*8 + rook_end[1])
+        return rook_start, rook_end, rook
                 
     def get_piece(self, position):
         return self.board[position[0]][position[1]]
     
+    def piece_info(self, position):
+        #(color, name) of the piece on position, or None
+        piece = self.board[position[0]][position[1]]
+        return None if piece is None else (piece.color, piece.name)
+
     def set_piece(self, position, piece):
+        old = self.board[position[0]][position[1]]
+        if old is not None:
+            self.hash ^= piece_hash(old, position)
+            self.material_score[old.color] -= old.value
+            self.forget_piece(old, position)
         self.board[position[0]][position[1]] = piece
         if piece is not None:
             piece.position = position
+            self.hash ^= piece_hash(piece, position)
+            self.material_score[piece.color] += piece.value
+            self.pieces_by_color[piece.color][position] = piece
+            if piece.name == "King":
+                self.king_pos[piece.color] = position
     
     def remove_piece(self, position):
+        piece = self.board[position[0]][position[1]]
+        if piece is not None:
+            self.hash ^= piece_hash(piece, position)
+            self.material_score[piece.color] -= piece.value
+            self.forget_piece(piece, position)
         self.board[position[0]][position[1]] = None
+
+    def forget_piece(self, piece, position):
+        del self.pieces_by_color[piece.color][position]
+        if piece.name == "King" and self.king_pos[piece.color] == position:
+            self.king_pos[piece.color] = None
     
     def coords_valid(self, position):
         return 0 <= position[0] < self.n_rows and 0 <= position[1] < self.n_cols
 
-    def convert_coords(self, coords):
-        if not isinstance(coords, str):
-            raise CoordCoversionError("Coordinates must be a string")
-        if len(coords) != 2:
-            raise CoordCoversionError("Coordinates must be 2 characters")
-        try:
-            x = int(coords[1]) - 1
-            y = ord(coords[0].upper()) - ord("A")
-        except CoordCoversionError:
-            raise CoordCoversionError("Coordinates must be in the format A1")
-        return (x, y)
-
-    def convert_coords_to_str(self, coords):
-        if not isinstance(coords, tuple):
-            raise CoordCoversionError("Coordinates must be a tuple")
-        if len(coords) != 2:
-            raise CoordCoversionError("Coordinates must be a tuple of length 2")
-        try:
-            x = coords[0] + 1
-            y = chr(coords[1] + ord("A"))
-        except CoordCoversionError:
-            raise CoordCoversionError("Coordinates must be in the format (0, 0)")
-        return f"{y}{x}"
-    
     def get_board_repr(self):
-        repr = ""
-        for row in self.board:
-            for piece in row:
-                if piece is None:
-                    repr += "__"
-                else:
-                    repr += str(piece)
-        return repr
+        return "".join("__" if piece is None else piece.symbol for row in self.board for piece in row)
 
     def __str__(self):
         repr = ""
@@ -1,11 +1,24 @@
+from .move_tables import KNIGHT_MOVES, KING_MOVES, RAY_MOVES, PAWN_PUSH_MOVE, PAWN_DOUBLE_PUSH_MOVE, PAWN_CAPTURE_MOVES, MOVES
+
+PIECE_VALUES = {"Pawn": 100, "Knight": 320, "Bishop": 330, "Rook": 500, "Queen": 900, "King": 10000}
+
 class Piece:
-    def __init__(self, color, position, name, symbol, value):
+    #a piece only holds its color and square, everything else is shared by its type
+    #whether a pawn, rook or king still has its first move is a board flag (board.is_unmoved)
+    __slots__ = ("color", "position")
+    name = None
+    value = 0
+    stretch = False
+    deltas = ()
+    symbols = {"white": None, "black": None}
+
+    def __init__(self, color, position):
         self.color = color
         self.position = position
-        self.name = name
-        self.symbol = symbol
-        self.stretch = False
-        self.value = value
+
+    @property
+    def symbol(self):
+        return self.symbols[self.color]
 
     def get_name(self):
         return self.name
@@ -19,14 +32,22 @@ class Piece:
     def __str__(self):
         return self.symbol
     
-    def get_possible_moves(self, board) -> list[(tuple, tuple)]:
+    def get_possible_moves(self, board, noisy=True, quiet=True) -> list[(tuple, tuple)]:
+        #sliding pieces: walk each precomputed ray once and stop at the first blocker
+        #noisy moves are captures (and pawn promotions), quiet moves are everything else
+        #moves come from the shared move tables, nothing is allocated per move
         moves = []
+        rays = RAY_MOVES[self.position]
         for delta in self.deltas:
-            curr = (self.position[0] + delta[0], self.position[1] + delta[1])
-            while board.coords_valid(curr) and self.move_valid(self.position, curr, board):
-                if (self.position, curr) not in moves:
-                    moves.append((self.position, curr))
-                curr = (curr[0] + delta[0], curr[1] + delta[1])
+            for move in rays[delta]:
+                piece = board.get_piece(move[1])
+                if piece is None:
+                    if quiet:
+                        moves.append(move)
+                    continue
+                if noisy and piece.color != self.color:
+                    moves.append(move)
+                break
         return moves
 
     def get_delta(self, start, end):   
@@ -54,14 +75,16 @@ class Piece:
         return False
         
 class Pawn(Piece):
-    def __init__(self, color, position):
-        symbol = "wP" if color == "white" else "bP"
-        super().__init__(color, position, "Pawn", symbol, 100)
-        if color == "black":
-            self.deltas = [(1, 0), (2, 0), (1, 1), (1, -1)]
-        else:
-            self.deltas = [(-1, 0), (-2, 0), (-1, 1), (-1, -1)]
-        self.first_move = True
+    __slots__ = ()
+    name = "Pawn"
+    value = PIECE_VALUES["Pawn"]
+    symbols = {"white": "wP", "black": "bP"}
+    #pawns move in a direction that depends on their color
+    color_deltas = {"white": ((-1, 0), (-2, 0), (-1, 1), (-1, -1)), "black": ((1, 0), (2, 0), (1, 1), (1, -1))}
+
+    @property
+    def deltas(self):
+        return self.color_deltas[self.color]
 
     def move_valid(self, start, end, board):
         #move is within possible deltas
@@ -70,15 +93,14 @@ class Pawn(Piece):
         delta_valid, _ = self.check_scaling(delta)
         if not delta_valid:
             return False
+        #the double push is only there on the pawn's first move
+        if abs(delta[0]) == 2 and not board.is_unmoved(start):
+            return False
         #check if there is a piece in the way
-        f_delta = self.forward_deltas()
         if delta[1] == 0:
-            if delta[0] == -1 or delta[0] == 1:
-                piece = board.get_piece((start[0] + delta[0], start[1]))
-                if piece is not None:
-                    return False
-            for d in range(1, abs(delta[0])):
-                piece = board.get_piece((start[0] + d*delta[0], start[1]))
+            step = 1 if delta[0] > 0 else -1
+            for d in range(1, abs(delta[0]) + 1):
+                piece = board.get_piece((start[0] + d*step, start[1]))
                 if piece is not None:
                     return False
         #check if there is a piece to capture
@@ -92,17 +114,35 @@ class Pawn(Piece):
 
         return True
 
+    def get_possible_moves(self, board, noisy=True, quiet=True) -> list[(tuple, tuple)]:
+        moves = []
+        position = self.position
+        push = PAWN_PUSH_MOVE[self.color][position]
+        if push is not None and board.get_piece(push[1]) is None:
+            #a push onto the last row promotes, which counts as noisy
+            if (noisy if push[1][0] == 0 or push[1][0] == 7 else quiet):
+                moves.append(push)
+            double = PAWN_DOUBLE_PUSH_MOVE[self.color][position]
+            if quiet and double is not None and board.is_unmoved(position) and board.get_piece(double[1]) is None:
+                moves.append(double)
+        if noisy:
+            for move in PAWN_CAPTURE_MOVES[self.color][position]:
+                piece = board.get_piece(move[1])
+                if piece is not None and piece.color != self.color:
+                    moves.append(move)
+        return moves
+
     def forward_deltas(self):
-        return self.deltas[:2] if len(self.deltas) == 4 else self.deltas[:1]
+        return self.deltas[:2]
 #start: 4, 4; end: 6, 4, delta: (2, 0)
 
 class Rook(Piece):
-    def __init__(self, color, position):
-        symbol = "wR" if color == "white" else "bR"
-        super().__init__(color, position, "Rook", symbol, 500)
-        self.deltas = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-        self.first_move = True
-        self.stretch = True
+    __slots__ = ()
+    name = "Rook"
+    value = PIECE_VALUES["Rook"]
+    symbols = {"white": "wR", "black": "bR"}
+    deltas = ((0, 1), (0, -1), (1, 0), (-1, 0))
+    stretch = True
     
     def move_valid(self, start, end, board):
         #move is within possible deltas
@@ -127,10 +167,19 @@ class Rook(Piece):
         return True
    
 class Knight(Piece):
-    def __init__(self, color, position):
-        symbol = "wN" if color == "white" else "bN"
-        super().__init__(color, position, "Knight", symbol, 320)
-        self.deltas = [(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)]
+    __slots__ = ()
+    name = "Knight"
+    value = PIECE_VALUES["Knight"]
+    symbols = {"white": "wN", "black": "bN"}
+    deltas = ((1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1))
+
+    def get_possible_moves(self, board, noisy=True, quiet=True) -> list[(tuple, tuple)]:
+        moves = []
+        for move in KNIGHT_MOVES[self.position]:
+            piece = board.get_piece(move[1])
+            if (quiet if piece is None else noisy and piece.color != self.color):
+                moves.append(move)
+        return moves
     
     def move_valid(self, start, end, board):
         #move is within possible deltas
@@ -145,11 +194,12 @@ class Knight(Piece):
         return True
 
 class Bishop(Piece):
-    def __init__(self, color, position):
-        symbol = "wB" if color == "white" else "bB"
-        super().__init__(color, position, "Bishop", symbol, 330)
-        self.deltas = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
-        self.stretch = True
+    __slots__ = ()
+    name = "Bishop"
+    value = PIECE_VALUES["Bishop"]
+    symbols = {"white": "wB", "black": "bB"}
+    deltas = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+    stretch = True
     
     def move_valid(self, start, end, board):
         #move is within possible deltas
@@ -172,11 +222,12 @@ class Bishop(Piece):
         return True 
 
 class Queen(Piece):
-    def __init__(self, color, position):
-        symbol = "wQ" if color == "white" else "bQ"
-        super().__init__(color, position, "Queen", symbol, 900)
-        self.deltas = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]
-        self.stretch = True
+    __slots__ = ()
+    name = "Queen"
+    value = PIECE_VALUES["Queen"]
+    symbols = {"white": "wQ", "black": "bQ"}
+    deltas = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1))
+    stretch = True
     
     def move_valid(self, start, end, board):
         #move is within possible deltas
@@ -201,41 +252,53 @@ class Queen(Piece):
         return True
 
 class King(Piece):
-    def __init__(self, color, position):
-        symbol = "wK" if color == "white" else "bK"
-        super().__init__(color, position, "King", symbol, 10000)
-        self.deltas = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1), (0, 2), (0, -2)]
-        self.castle_deltas = [(0, 2), (0, -2)]
-        self.first_move = True
-        self.in_check = False
+    __slots__ = ()
+    name = "King"
+    value = PIECE_VALUES["King"]
+    symbols = {"white": "wK", "black": "bK"}
+    deltas = ((0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1), (0, 2), (0, -2))
+    castle_deltas = ((0, 2), (0, -2))
+
+    def get_possible_moves(self, board, noisy=True, quiet=True) -> list[(tuple, tuple)]:
+        moves = []
+        position = self.position
+        for move in KING_MOVES[position]:
+            piece = board.get_piece(move[1])
+            if (quiet if piece is None else noisy and piece.color != self.color):
+                moves.append(move)
+        if quiet and board.is_unmoved(position):
+            for delta in self.castle_deltas:
+                curr = (position[0] + delta[0], position[1] + delta[1])
+                if board.coords_valid(curr) and self.move_valid(position, curr, board):
+                    moves.append(MOVES[position][curr])
+        return moves
     
     def move_valid(self, start, end, board):
         delta = self.get_delta(start, end)
         #check for castle
-        if self.first_move:
-            if delta in self.castle_deltas:
-                current = start
-                while current != end:
-                    current = (current[0], current[1] + delta[1])
-                    piece = board.get_piece(current)
-                    if piece is not None:
-                        return False
-                #nothing in the way at this point
-                if delta[1] == 2:
-                    current = (current[0], current[1] + 1)
-                else:
-                    current = (current[0], current[1] - 2)
-                piece = board.get_piece(current)
-                if piece is None:
-                    return False
-                if piece.name != "Rook":
-                    return False
-                if piece.color != self.color:
-                    return False
-                if not piece.first_move:
+        if delta in self.castle_deltas:
+            if not board.is_unmoved(start):
+                return False
+            #rook sits in the corner, every square between it and the king must be empty
+            step = 1 if delta[1] > 0 else -1
+            rook_pos = (start[0], start[1] + 3*step) if step == 1 else (start[0], start[1] - 4)
+            if not board.coords_valid(rook_pos):
+                return False
+            current = (start[0], start[1] + step)
+            while current != rook_pos:
+                if board.get_piece(current) is not None:
                     return False
-                self.first_move = False
-                return True
+                current = (current[0], current[1] + step)
+            piece = board.get_piece(rook_pos)
+            if piece is None:
+                return False
+            if piece.name != "Rook":
+                return False
+            if piece.color != self.color:
+                return False
+            if not board.is_unmoved(rook_pos):
+                return False
+            return True
         #move is within possible deltas
         if delta not in self.deltas:
             return False
@@ -244,6 +307,4 @@ class King(Piece):
         if self.is_friendly(board.get_piece(end)):
             return False
 
-        self.first_move = False
-
-        return True
\ No newline at end of file
+        return True
@@ -0,0 +1,70 @@
+from .move_tables import SQUARES, SQUARE_MOVES
+from .zobrist import SIDE_KEY
+
+#packed move: start square (6 bits) | end square (6 bits) << 6 | flags, squares are row*8 + col
+PROMOTION = 1 << 12
+CASTLE = 1 << 13
+#start == end never happens, so 0 can stand for no move
+NO_MOVE = 0
+
+#4-bit piece codes for the packed position, index + 1 (0 is unused)
+PIECE_CODES = [(color, name) for color in ("white", "black") for name in ("Pawn", "Knight", "Bishop", "Rook", "Queen", "King")]
+CODE_OF = {piece: i + 1 for i, piece in enumerate(PIECE_CODES)}
+SYMBOLS = {"Pawn": "P", "Knight": "N", "Bishop": "B", "Rook": "R", "Queen": "Q", "King": "K"}
+POSITION_BYTES = 32
+
+def pack_move(move, board=None):
+    #16-bit int for a ((row, col), (row, col)) move, with board the promotion and castle flags are set too
+    if move is None:
+        return NO_MOVE
+    start, end = move
+    code = start[0]*8 + start[1] | (end[0]*8 + end[1]) << 6
+    if board is not None:
+        info = board.piece_info(start)
+        if info is not None and info[1] == "Pawn" and (end[0] == 0 or end[0] == 7):
+            code |= PROMOTION
+        elif info is not None and info[1] == "King" and abs(end[1] - start[1]) == 2:
+            code |= CASTLE
+    return code
+
+def unpack_move(code):
+    #the shared move tuple for a packed move, or None for NO_MOVE
+    if not code & 4095:
+        return None
+    return SQUARE_MOVES[code & 63][code >> 6 & 63]
+
+def encode_position(board):
+    #32 bytes: occupied squares (8), a 4-bit code per piece in square order (16, room for 32 pieces)
+    #and the first_move squares (8); the side to move is not included
+    occupied = 0
+    codes = []
+    for sq, position in enumerate(SQUARES):
+        info = board.piece_info(position)
+        if info is not None:
+            occupied |= 1 << sq
+            codes.append(CODE_OF[info])
+    if len(codes) > 32:
+        raise ValueError("positions with more than 32 pieces do not fit in 32 bytes")
+    codes += [0]*(32 - len(codes))
+    packed = bytes(codes[i] | codes[i + 1] << 4 for i in range(0, 32, 2))
+    return occupied.to_bytes(8, "little") + packed + board.unmoved.to_bytes(8, "little")
+
+def decode_position(data, board_cls, color="white"):
+    #board_cls board from encode_position bytes, color is the side to move so the hash matches the board it came from
+    occupied = int.from_bytes(data[:8], "little")
+    first_move = int.from_bytes(data[24:32], "little")
+    board_repr = [["__"]*8 for _ in range(8)]
+    i = 0
+    for sq in range(64):
+        if occupied >> sq & 1:
+            piece_color, name = PIECE_CODES[(data[8 + i // 2] >> (4*(i % 2)) & 15) - 1]
+            board_repr[sq // 8][sq % 8] = piece_color[0] + SYMBOLS[name]
+            i += 1
+    board = board_cls(board_repr)
+    #parsed pawns, rooks and kings all start with their first move, take it away where the mask says so
+    for sq, position in enumerate(SQUARES):
+        if occupied >> sq & 1 and not first_move >> sq & 1:
+            board.clear_first_move(position)
+    if color == "black":
+        board.hash ^= SIDE_KEY
+    return board
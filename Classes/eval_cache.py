@@ -0,0 +1,45 @@
+from collections import OrderedDict
+
+#rough size of one entry (key, score, ordered dict link), used to turn MB into entries
+ENTRY_BYTES = 200
+
+class EvalCache:
+    #bounded store of evaluation results, least recently used entries are dropped first: a hit moves its
+    #entry to the back and a store into a full cache evicts the front
+    #values are kept as the evaluation returned them, so a hit gives exactly the score it would recompute
+    def __init__(self, size_mb=4):
+        self.size_mb = size_mb
+        self.size = max(1, int(size_mb*1024*1024) // ENTRY_BYTES)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.probes = 0
+        self.evictions = 0
+
+    def probe(self, key):
+        #the stored value or None
+        self.probes += 1
+        value = self.entries.get(key)
+        if value is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        entries = self.entries
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.probes = 0
+        self.evictions = 0
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __len__(self):
+        return len(self.entries)
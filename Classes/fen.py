@@ -0,0 +1,39 @@
+from .zobrist import SIDE_KEY
+
+def parse_fen(fen, board_cls):
+    #(board, color to move) from a FEN, castling rights become the kings' and rooks' first_move flags
+    #and only pawns on their starting row may double push, en passant and move clocks are ignored
+    fields = fen.split()
+    board_repr = []
+    for rank in fields[0].split("/"):
+        row = []
+        for char in rank:
+            if char.isdigit():
+                row.extend(["__"]*int(char))
+            else:
+                row.append(("w" if char.isupper() else "b") + char.upper())
+        board_repr.append(row)
+    board = board_cls(board_repr)
+    color = "black" if len(fields) > 1 and fields[1] == "b" else "white"
+    rights = fields[2] if len(fields) > 2 else "-"
+    #castling right letter -> (king square, rook square)
+    corners = {"K": ((7, 4), (7, 7)), "Q": ((7, 4), (7, 0)), "k": ((0, 4), (0, 7)), "q": ((0, 4), (0, 0))}
+    keep = set()
+    for right, squares in corners.items():
+        if right in rights:
+            keep.update(squares)
+    for row in range(8):
+        for col in range(8):
+            info = board.piece_info((row, col))
+            if info is None:
+                continue
+            if info[1] == "Pawn":
+                home = 6 if info[0] == "white" else 1
+                if row != home:
+                    board.clear_first_move((row, col))
+            elif info[1] in ("Rook", "King") and (row, col) not in keep:
+                board.clear_first_move((row, col))
+    #the hash carries the side to move, as if the game had been played up to here from white's turn
+    if color == "black":
+        board.hash ^= SIDE_KEY
+    return board, color
@@ -0,0 +1,80 @@
+from .chessPieces import PIECE_VALUES
+
+#all sources, in the order their scores rank moves
+SOURCES = ("hash", "captures", "promotions", "killers", "history")
+HASH_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 26
+PROMOTION_SCORE = 1 << 25
+KILLER_SCORE = 1 << 24
+KILLERS_PER_PLY = 2
+
+class MoveOrderer:
+    #sorts moves so alpha-beta sees likely cutoffs first, sources can be switched off one by one
+    def __init__(self, sources=SOURCES):
+        self.sources = set(sources)
+        self.killers = {}
+        #(color, piece name, target square) -> how often moving there caused a cutoff, weighted by depth
+        self.history = {}
+
+    def new_search(self):
+        #killers belong to one search, history is kept but fades
+        self.killers = {}
+        for key in self.history:
+            self.history[key] //= 2
+
+    def score(self, board, move, ply, hash_moves):
+        start, end = move
+        if "hash" in self.sources and move in hash_moves:
+            return HASH_SCORE - hash_moves.index(move)
+        color, name = board.piece_info(start)
+        victim = board.piece_info(end)
+        if victim is not None:
+            if "captures" in self.sources:
+                return CAPTURE_SCORE + PIECE_VALUES[victim[1]] - PIECE_VALUES[name]
+            return 0
+        if name == "Pawn" and (end[0] == 0 or end[0] == 7) and "promotions" in self.sources:
+            return PROMOTION_SCORE
+        if "killers" in self.sources and move in self.killers.get(ply, ()):
+            return KILLER_SCORE
+        if "history" in self.sources:
+            return self.history.get((color, name, end), 0)
+        return 0
+
+    def order(self, board, moves, ply, hash_moves=()):
+        #hash_moves are tried first, in the order given (e.g. previous iteration's best, then the table's move)
+        if not self.sources:
+            return moves
+        hash_moves = [move for move in hash_moves if move is not None]
+        return sorted(moves, key=lambda move: self.score(board, move, ply, hash_moves), reverse=True)
+
+    def cutoff(self, board, move, ply, depth):
+        #called with the move unmade when it caused a beta cutoff
+        if board.piece_info(move[1]) is not None:
+            return
+        color, name = board.piece_info(move[0])
+        if name == "Pawn" and (move[1][0] == 0 or move[1][0] == 7):
+            return
+        if "killers" in self.sources:
+            killers = self.killers.setdefault(ply, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[KILLERS_PER_PLY:]
+        if "history" in self.sources:
+            key = (color, name, move[1])
+            self.history[key] = self.history.get(key, 0) + depth*depth
+
+def see(board, move):
+    #static exchange evaluation: material the side playing the capture move wins once both sides have
+    #recaptured on its square with their least valuable piece for as long as that pays, promotions ignored
+    start, end = move
+    color = board.piece_info(start)[0]
+    victim = board.piece_info(end)
+    gain = PIECE_VALUES[victim[1]] if victim is not None else 0
+    record = board.make_move(start, end)
+    other = "white" if color == "black" else "black"
+    replies = [reply for reply in board.legal_moves(other, quiet=False) if reply[1] == end]
+    if replies:
+        reply = min(replies, key=lambda reply: PIECE_VALUES[board.piece_info(reply[0])[1]])
+        gain -= max(0, see(board, reply))
+    board.unmake_move(record)
+    return gain
@@ -0,0 +1,26 @@
+class MovePicker:
+    #yields legal moves in stages: remembered moves (hash, previous best), then captures and
+    #promotions, then quiet moves; a stage is only generated once the one before it is used up
+    #the board may be changed between yields as long as it is restored before asking for the next move
+    def __init__(self, board, color, orderer=None, ply=0, hash_moves=()):
+        self.board = board
+        self.color = color
+        self.orderer = orderer
+        self.ply = ply
+        self.hash_moves = hash_moves
+
+    def __iter__(self):
+        board, color = self.board, self.color
+        tried = []
+        for move in self.hash_moves:
+            if move is not None and move not in tried and board.is_legal(move, color):
+                tried.append(move)
+                yield move
+        for noisy in (True, False):
+            if self.orderer is None:
+                moves = board.iter_legal_moves(color, noisy=noisy, quiet=not noisy)
+            else:
+                moves = self.orderer.order(board, board.legal_moves(color, noisy=noisy, quiet=not noisy), self.ply)
+            for move in moves:
+                if move not in tried:
+                    yield move
@@ -0,0 +1,48 @@
+#lookup tables built once at import, indexed by (row, col) on the 8x8 board
+#white moves towards row 0, black towards row 7 (see Pawn.deltas)
+
+KNIGHT_DELTAS = [(1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1)]
+KING_DELTAS = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, 1), (1, -1), (-1, -1)]
+ROOK_DELTAS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+BISHOP_DELTAS = [(1, 1), (-1, 1), (1, -1), (-1, -1)]
+PAWN_DIRECTION = {"white": -1, "black": 1}
+
+SQUARES = [(row, col) for row in range(8) for col in range(8)]
+
+def on_board(position):
+    return 0 <= position[0] < 8 and 0 <= position[1] < 8
+
+def _steps(position, deltas):
+    targets = [(position[0] + d[0], position[1] + d[1]) for d in deltas]
+    return tuple(t for t in targets if on_board(t))
+
+def _ray(position, delta):
+    ray = []
+    current = (position[0] + delta[0], position[1] + delta[1])
+    while on_board(current):
+        ray.append(current)
+        current = (current[0] + delta[0], current[1] + delta[1])
+    return tuple(ray)
+
+def _pawn_step(position, color, n):
+    target = (position[0] + n*PAWN_DIRECTION[color], position[1])
+    return target if on_board(target) else None
+
+KNIGHT_TARGETS = {sq: _steps(sq, KNIGHT_DELTAS) for sq in SQUARES}
+KING_TARGETS = {sq: _steps(sq, KING_DELTAS) for sq in SQUARES}
+#RAYS[square][delta] is every square from square outwards in direction delta, nearest first
+RAYS = {sq: {d: _ray(sq, d) for d in ROOK_DELTAS + BISHOP_DELTAS} for sq in SQUARES}
+PAWN_PUSH = {color: {sq: _pawn_step(sq, color, 1) for sq in SQUARES} for color in PAWN_DIRECTION}
+PAWN_DOUBLE_PUSH = {color: {sq: _pawn_step(sq, color, 2) for sq in SQUARES} for color in PAWN_DIRECTION}
+PAWN_CAPTURES = {color: {sq: _steps(sq, [(PAWN_DIRECTION[color], 1), (PAWN_DIRECTION[color], -1)]) for sq in SQUARES} for color in PAWN_DIRECTION}
+
+#MOVES[start][end] is the one shared (start, end) tuple for that move, generators hand these out instead of
+#building a new tuple per move; SQUARE_MOVES is the same table indexed by square number (row*8 + col)
+SQUARE_MOVES = [[(start, end) for end in SQUARES] for start in SQUARES]
+MOVES = {start: dict(zip(SQUARES, SQUARE_MOVES[i])) for i, start in enumerate(SQUARES)}
+KNIGHT_MOVES = {sq: tuple(MOVES[sq][t] for t in KNIGHT_TARGETS[sq]) for sq in SQUARES}
+KING_MOVES = {sq: tuple(MOVES[sq][t] for t in KING_TARGETS[sq]) for sq in SQUARES}
+RAY_MOVES = {sq: {d: tuple(MOVES[sq][t] for t in ray) for d, ray in RAYS[sq].items()} for sq in SQUARES}
+PAWN_PUSH_MOVE = {color: {sq: t and MOVES[sq][t] for sq, t in PAWN_PUSH[color].items()} for color in PAWN_DIRECTION}
+PAWN_DOUBLE_PUSH_MOVE = {color: {sq: t and MOVES[sq][t] for sq, t in PAWN_DOUBLE_PUSH[color].items()} for color in PAWN_DIRECTION}
+PAWN_CAPTURE_MOVES = {color: {sq: tuple(MOVES[sq][t] for t in ts) for sq, ts in PAWN_CAPTURES[color].items()} for color in PAWN_DIRECTION}
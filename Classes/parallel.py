@@ -0,0 +1,123 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .transposition import TranspositionTable
+from .move_picker import MovePicker
+
+class WorkerGame:
+    #stands in for Game inside a worker process: no players, just a private transposition table or a
+    #handle to the shared one, the game's earlier positions come with every root move
+    def __init__(self, tt):
+        if getattr(tt, "shared", False):
+            self.tt = tt
+        else:
+            self.tt = TranspositionTable(tt) if tt else None
+
+#(player, shared alpha, hash of the root being searched), one per worker process
+_worker = None
+
+def _init_worker(player_cls, color, depth, tt, shared_alpha, selective, eval_cache_mb, pawn_table_mb):
+    global _worker
+    #every worker keeps private evaluation caches of the player's sizes
+    player = player_cls("worker", color, WorkerGame(tt), depth, selective=selective, eval_cache_mb=eval_cache_mb,
+        pawn_table_mb=pawn_table_mb)
+    _worker = [player, shared_alpha, None]
+
+def _search_move(board, move, depth, deadline, history, beta):
+    #search one root move with the best score any worker has found so far as alpha
+    #returns (move, score, alpha used, nodes, tt probes, tt hits), score is None if the deadline passed
+    from .players import SearchTimeout
+    player, shared_alpha, root_hash = _worker
+    tt = player.tt
+    if root_hash != board.hash:
+        #new root position, keep the table but let old entries be replaced
+        #a shared table is aged once by the process that owns it, not by every worker
+        _worker[2] = board.hash
+        if tt is not None and not getattr(tt, "shared", False):
+            tt.new_search()
+        player.orderer.new_search()
+    if deadline is not None:
+        player.deadline = time.perf_counter() + deadline - time.time()
+    player.history = set(history)
+    alpha = shared_alpha.value
+    nodes = player.nodes
+    probes, hits = (tt.probes, tt.hits) if tt is not None else (0, 0)
+    next_color = "white" if player.color == "black" else "black"
+    board.make_move(move[0], move[1])
+    try:
+        score = player.minimax(board, depth - 1, next_color, alpha, beta, ply=1)[1]
+    except SearchTimeout:
+        score = None
+    finally:
+        player.deadline = None
+    if score is not None:
+        with shared_alpha.get_lock():
+            if score > shared_alpha.value:
+                shared_alpha.value = score
+    if tt is not None:
+        probes, hits = tt.probes - probes, tt.hits - hits
+    return move, score, alpha, player.nodes - nodes, probes, hits
+
+class ParallelSearch:
+    #splits the root moves of a search over a pool of worker processes, each with its own board
+    #copy, sharing the best root score so far as their alpha bound
+    #tt is the game's table: a SharedTranspositionTable is used by every worker, any other table
+    #only gives its size and each worker keeps a private one
+    def __init__(self, player, workers, tt=None):
+        self.player = player
+        self.workers = workers
+        if getattr(tt, "shared", False):
+            self.tt = tt
+        else:
+            self.tt = tt.size_mb if tt is not None else 0
+        self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+        self.executor = None
+        #transposition table use summed over the workers
+        self.probes = 0
+        self.hits = 0
+
+    def start(self):
+        #the pool is created on first use and kept for every later move
+        if self.executor is None:
+            player = self.player
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                initargs=(type(player), player.color, player.depth, self.tt, self.shared_alpha, player.selective,
+                player.eval_cache.size_mb if player.eval_cache is not None else 0,
+                player.pawn_table.size_mb if player.pawn_table is not None else 0))
+
+    def search(self, board, depth, first_move=None, deadline=None, alpha=float('-inf'), beta=float('inf')):
+        #returns (best action, best score) like Player.minimax, deadline is a time.time() value
+        from .players import SearchTimeout
+        self.start()
+        player = self.player
+        moves = list(MovePicker(board, player.color, player.orderer, 0, (first_move,)))
+        if not moves:
+            return player.minimax(board, depth, player.color, alpha, beta)
+        self.shared_alpha.value = alpha
+        #the root is part of the path, so a root move cannot repeat back into it unnoticed
+        history = player.history | {board.hash}
+        futures = [self.executor.submit(_search_move, board, move, depth, deadline, history, beta) for move in moves]
+        best, best_score, best_exact = None, float('-inf'), False
+        for future in futures:
+            move, score, alpha, nodes, probes, hits = future.result()
+            player.nodes += nodes
+            self.probes += probes
+            self.hits += hits
+            if score is None:
+                for pending in futures:
+                    pending.cancel()
+                raise SearchTimeout()
+            #a score at or below the alpha it was searched with is only an upper bound,
+            #so on ties prefer moves whose score is exact
+            exact = score > alpha
+            if score > best_score or (score == best_score and exact and not best_exact) or best is None:
+                best, best_score, best_exact = move, score, exact
+        return best, best_score
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
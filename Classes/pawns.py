@@ -0,0 +1,43 @@
+#pawn structure terms, they only read the two pawn bitboards (bit row*8 + col, white moves towards row 0)
+#so a score can be cached by pawn_key alone
+DOUBLED_PAWN = 10
+ISOLATED_PAWN = 10
+PASSED_PAWN = 20
+
+FILES = [sum(1 << (row*8 + col) for row in range(8)) for col in range(8)]
+#files next to each file
+NEIGHBOUR_FILES = [(FILES[col - 1] if col > 0 else 0) | (FILES[col + 1] if col < 7 else 0) for col in range(8)]
+
+def _front_spans(ahead):
+    #squares an enemy pawn must avoid for the pawn on each square to be passed: its own and the neighbouring
+    #files on the rows ahead of it
+    spans = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        files = FILES[col] | NEIGHBOUR_FILES[col]
+        rows = sum(0xFF << (r*8) for r in range(8) if ahead(r, row))
+        spans.append(files & rows)
+    return spans
+
+FRONT_SPANS = {"white": _front_spans(lambda r, row: r < row), "black": _front_spans(lambda r, row: r > row)}
+
+def side_structure(pawns, enemy, color):
+    #doubled and isolated pawns cost, passed pawns score, from color's side only
+    score = 0
+    for col in range(8):
+        count = (pawns & FILES[col]).bit_count()
+        if count:
+            score -= DOUBLED_PAWN*(count - 1)
+            if not pawns & NEIGHBOUR_FILES[col]:
+                score -= ISOLATED_PAWN*count
+    spans = FRONT_SPANS[color]
+    while pawns:
+        low = pawns & -pawns
+        if not enemy & spans[low.bit_length() - 1]:
+            score += PASSED_PAWN
+        pawns ^= low
+    return score
+
+def pawn_structure(white, black):
+    #white's pawn structure minus black's
+    return side_structure(white, black, "white") - side_structure(black, white, "black")
@@ -1,77 +1,470 @@
 import random
+import time
+from Classes.transposition import EXACT, LOWER_BOUND, UPPER_BOUND
+from Classes.move_ordering import MoveOrderer, see
+from Classes.chessPieces import PIECE_VALUES
+from Classes.move_picker import MovePicker
+from Classes.parallel import ParallelSearch
+from Classes.search_stats import SearchStats
+from Classes.eval_cache import EvalCache
+from Classes.pawns import pawn_structure
+from Classes.zobrist import EVAL_KEYS
 from Setup.init_board_reprs import *
 
+#iterative deepening stops here even if there is time left
+MAX_DEPTH = 64
+#the clock is only read every this many nodes
+TIME_CHECK_NODES = 256
+#score for mating at the root, a mate n plies away scores MATE_SCORE - n so shorter mates are preferred
+MATE_SCORE = 1000000
+#no search reaches this many plies, anything closer to MATE_SCORE is a mate score
+MAX_MATE_PLY = 1000
+
+#selective search techniques, all off unless a player is given them
+PRUNING = ("pvs", "aspiration", "null_move", "lmr")
+#quiescence searches captures and promotions past depth 0, see makes it skip captures that lose material
+QUIESCENCE = ("quiescence", "see")
+#batch_eval scores all children of a depth 1 node in one NumPy call (Classes/batch_eval.py, needs numpy)
+#pawn_structure adds the Classes/pawns.py terms to the evaluation
+SELECTIVE = PRUNING + QUIESCENCE + ("batch_eval", "pawn_structure")
+#scores are material plus mobility in steps of 0.1, so this window only fits one score
+NULL_WINDOW = 0.01
+#iterative deepening first searches this far either side of the previous iteration's score
+ASPIRATION_WINDOW = 50
+#depth taken off the search after a null move
+NULL_MOVE_REDUCTION = 2
+#late move reductions: moves before this index and nodes shallower than this depth are never reduced
+LMR_MOVES = 3
+LMR_DEPTH = 3
+#the mobility part of the heuristic is 0.1 a move, it is not computed when material alone is this far outside the window
+LAZY_MARGIN = 10
+#quiescence skips a capture that cannot lift the score to the window even with this much to spare
+DELTA_MARGIN = 200
+
+def is_mate_score(score):
+    return abs(score) >= MATE_SCORE - MAX_MATE_PLY
+
 class NoMovesLeftError(Exception):
     pass
 
+class SearchTimeout(Exception):
+    pass
+
 class Player:
-    def __init__(self, name, color, game):
+    def __init__(self, name, color, game, depth=3, time_limit=None, orderer=None, workers=1, selective=(),
+            eval_cache_mb=0, pawn_table_mb=0):
         self.name = name
         self.color = color
         self.game = game
+        #fixed search depth, or seconds per move for iterative deepening when time_limit is set
+        self.depth = depth
+        self.time_limit = time_limit
+        self.deadline = None
+        self.nodes = 0
+        self.orderer = orderer if orderer is not None else MoveOrderer()
+        #names from SELECTIVE to switch on
+        self.selective = tuple(selective)
+        self.pvs = "pvs" in self.selective
+        self.aspiration = "aspiration" in self.selective
+        self.null_move = "null_move" in self.selective
+        self.lmr = "lmr" in self.selective
+        self.quiescence = "quiescence" in self.selective
+        self.see_pruning = "see" in self.selective
+        self.pawn_structure = "pawn_structure" in self.selective
+        self.evaluate_batch = None
+        if "batch_eval" in self.selective:
+            #numpy is only needed by players that batch their leaves
+            from Classes.batch_eval import evaluate_bitboards
+            self.evaluate_batch = evaluate_bitboards
+        #leaf scores by position hash and pawn structure scores by pawn_key, kept across moves since the
+        #evaluation never changes for a player; 0 MB turns a cache off
+        self.eval_cache = EvalCache(eval_cache_mb) if eval_cache_mb else None
+        self.pawn_table = EvalCache(pawn_table_mb) if pawn_table_mb else None
+        #more than one worker splits the root moves over a process pool
+        self.workers = workers
+        #transposition table, the game's one shared by both players unless replaced with one of its own
+        self.tt = getattr(game, "tt", None)
+        #table keys are board.hash ^ tt_salt, the salt is 0 for the plain evaluation
+        self.tt_salt = 0
+        for name in set(self.selective):
+            self.tt_salt ^= EVAL_KEYS.get(name, 0)
+        self.parallel = None
+        if workers > 1:
+            self.parallel = ParallelSearch(self, workers, self.tt)
+        #hashes of the game's earlier positions plus the current search path, reaching one again is a draw
+        self.history = set()
+        #search counters, only collected when the game writes a stats stream
+        self.stats = SearchStats() if getattr(game, "stats_stream", None) is not None else None
+        #stats record of the last move played by _auto_play
+        self.last_stats = None
 
     def get_heuristic(self, board):
+        cache = self.eval_cache
+        if cache is not None:
+            h = cache.probe(board.hash)
+            if h is not None:
+                return h
         h = self.get_board_heuristic(board)
         h = h + self.get_space_heuristic(board, self.color)
+        if cache is not None:
+            cache.store(board.hash, h)
         return h
 
     def get_board_heuristic(self, board):
-        h = 0
-        for piece in board.get_pieces():
-            if piece.color == self.color:
-                h += piece.value
-            else:
-                h -= piece.value
+        other = "white" if self.color == "black" else "black"
+        h = board.material(self.color) - board.material(other)
+        if self.pawn_structure:
+            h = h + self.get_pawn_heuristic(board.pawn_key())
         return h
 
+    def get_pawn_heuristic(self, key):
+        #pawn structure from self.color's side for a board's pawn_key
+        table = self.pawn_table
+        if table is not None:
+            score = table.probe(key)
+            if score is not None:
+                return score
+        score = pawn_structure(*key)
+        if self.color == "black":
+            score = -score
+        if table is not None:
+            table.store(key, score)
+        return score
+
     def get_space_heuristic(self, board, color):
-        h = 0
-        for piece in board.get_pieces():
-            if piece.color == color:
-                h += (len(piece.get_possible_moves(board)))*0.1
-            else:
-                h -= (len(piece.get_possible_moves(board)))*0.1
-        return h
+        #mobility counts every piece's possible moves, same as summing them per piece
+        other = "white" if color == "black" else "black"
+        return board.mobility(color)*0.1 - board.mobility(other)*0.1
 
     def get_king_pos_heuristic(self, board, color):
         king_pos = board.get_king_pos(color)
         
 
-    def minimax(self, board, depth, color, alpha, beta):
-        #return the best action and the best score
-        if depth == 0 or self.game.game_over():
+    def minimax(self, board, depth, color, alpha, beta, first_move=None, ply=0, allow_null=True):
+        #return the best action and the best score, first_move is searched first if legal
+        #allow_null is False right after a null move so the same side never passes twice in a row
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % TIME_CHECK_NODES == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        #terminal tests run on the node's own board: repetition, a lost king, and at the end of the
+        #move loop mate or stalemate
+        history = self.history
+        if ply > 0 and board.hash in history:
+            return None, 0
+        if board.get_king_pos(color) is None:
+            return None, self.mate_score(color, ply)
+        stats = self.stats
+        if depth <= 0:
+            if self.quiescence:
+                return None, self.quiesce(board, color, alpha, beta, ply)
+            if stats is not None:
+                return None, stats.evaluate(self, board)
             return None, self.get_heuristic(board)
-        
+
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            entry = tt.probe(board.hash ^ self.tt_salt)
+            if entry is not None:
+                hash_move = entry[4]
+                if entry[1] >= depth:
+                    bound, score = self.from_tt(entry[2], entry[3], ply)
+                    if bound == EXACT:
+                        return hash_move, score
+                    if bound == LOWER_BOUND:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        return hash_move, score
+        if depth == 1 and self.evaluate_batch is not None and not self.quiescence:
+            return self.evaluate_frontier(board, color, ply)
+        alpha_orig, beta_orig = alpha, beta
+
         next_color = "white" if color == "black" else "black"
+        maximizing = color == self.color
+        in_check = (self.null_move or self.lmr) and board.in_check(color)
+        #null move: if the other side moving twice still leaves the node outside the window, a real move
+        #would too; never in check, where passing is illegal, or with only pawns left, where zugzwang
+        #makes passing better than any move
+        if self.null_move and allow_null and ply > 0 and depth > NULL_MOVE_REDUCTION and not in_check \
+                and board.has_pieces(color):
+            bound = beta if maximizing else alpha
+            if not is_mate_score(bound) and abs(bound) != float('inf'):
+                board.make_null_move()
+                if maximizing:
+                    score = self.minimax(board, depth - 1 - NULL_MOVE_REDUCTION, next_color, beta - NULL_WINDOW, beta,
+                        ply=ply + 1, allow_null=False)[1]
+                else:
+                    score = self.minimax(board, depth - 1 - NULL_MOVE_REDUCTION, next_color, alpha, alpha + NULL_WINDOW,
+                        ply=ply + 1, allow_null=False)[1]
+                board.unmake_null_move()
+                if score >= beta if maximizing else score <= alpha:
+                    return None, bound
+
+        #moves come lazily in stages, so a cutoff skips generating the rest
+        picker = MovePicker(board, color, self.orderer, ply, (first_move, hash_move))
+        if stats is not None:
+            picker = stats.timed_moves(picker)
 
         bestAction = None
-        if color == self.color:
-            maxEval = float('-inf')
-            for action in board.action_space(color):
-                new_board = board.copy()
-                new_board.move_piece(action[0], action[1], color)
-                newEval = self.minimax(new_board, depth - 1, next_color, alpha, beta)[1]
-                maxEval = max(maxEval, newEval)
-                if newEval >= maxEval:
+        bestEval = float('-inf') if maximizing else float('inf')
+        #positions left on the path after a timeout do not matter, search_root rebuilds the set
+        history.add(board.hash)
+        for index, action in enumerate(picker):
+            if index == 0 or not (self.pvs or self.lmr):
+                record = board.make_move(action[0], action[1])
+                newEval = self.minimax(board, depth - 1, next_color, alpha, beta, ply=ply + 1)[1]
+            else:
+                #late quiet moves are searched one ply shallower, unless they escape or give check
+                reduction = 0
+                if self.lmr and index >= LMR_MOVES and depth >= LMR_DEPTH and not in_check and self.is_quiet(board, action):
+                    reduction = 1
+                record = board.make_move(action[0], action[1])
+                if reduction and board.in_check(next_color):
+                    reduction = 0
+                #pvs: after the first move the rest only have to be shown worse, which a null window does cheaply
+                low, high = alpha, beta
+                if self.pvs:
+                    low, high = (alpha, alpha + NULL_WINDOW) if maximizing else (beta - NULL_WINDOW, beta)
+                newEval = self.minimax(board, depth - 1 - reduction, next_color, low, high, ply=ply + 1)[1]
+                #a move that beats the window it was shown, reduced or not, is searched again in full
+                if reduction or self.pvs:
+                    if maximizing:
+                        research = newEval > alpha and (reduction or newEval < beta)
+                    else:
+                        research = newEval < beta and (reduction or newEval > alpha)
+                    if research:
+                        newEval = self.minimax(board, depth - 1, next_color, alpha, beta, ply=ply + 1)[1]
+            board.unmake_move(record)
+            if maximizing:
+                bestEval = max(bestEval, newEval)
+                if newEval >= bestEval:
                     bestAction = action
                 alpha = max(alpha, newEval)
-                if alpha >= beta:
-                    break
-            return bestAction, maxEval
-        else:
-            minEval = float('inf')
-            bestAction= None
-            for action in board.action_space(color):
-                new_board = board.copy()
-                new_board.move_piece(action[0], action[1], color)
-                newEval = self.minimax(new_board, depth - 1, next_color, alpha, beta)[1]
-                minEval = min(minEval, newEval)
-                if newEval <= minEval:
+            else:
+                bestEval = min(bestEval, newEval)
+                if newEval <= bestEval:
                     bestAction = action
                 beta = min(beta, newEval)
-                if alpha >= beta:
-                    break
-            return bestAction, minEval
+            if alpha >= beta:
+                self.orderer.cutoff(board, action, ply, depth)
+                if stats is not None:
+                    stats.cutoff(index)
+                break
+        history.discard(board.hash)
+
+        if bestAction is None:
+            #no legal moves: checkmate loses for the side to move, stalemate is even
+            if not board.in_check(color):
+                return None, 0
+            return None, self.mate_score(color, ply)
+
+        if tt is not None:
+            if bestEval <= alpha_orig:
+                bound = UPPER_BOUND
+            elif bestEval >= beta_orig:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            tt.store(board.hash ^ self.tt_salt, depth, *self.to_tt(bound, bestEval, ply), bestAction)
+        return bestAction, bestEval
+
+    def evaluate_frontier(self, board, color, ply):
+        #depth 1 node with batch_eval: every child is a leaf, so they are made one after another and scored
+        #in one call instead of one get_heuristic each; there are no cutoffs, so the score is exact
+        moves = board.legal_moves(color)
+        if not moves:
+            return None, self.mate_score(color, ply) if board.in_check(color) else 0
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        self.nodes += len(moves)
+        next_color = "white" if color == "black" else "black"
+        scores = [None]*len(moves)
+        bitboards, unmoved, leaves = [], [], []
+        cache = self.eval_cache
+        for i, move in enumerate(moves):
+            record = board.make_move(move[0], move[1])
+            #the same terminal tests minimax runs on entering the child
+            if board.hash in self.history:
+                scores[i] = 0
+            elif board.get_king_pos(next_color) is None:
+                scores[i] = self.mate_score(next_color, ply + 1)
+            else:
+                cached = cache.probe(board.hash) if cache is not None else None
+                if cached is not None:
+                    scores[i] = cached
+                else:
+                    bitboards.append(board.piece_bitboards())
+                    unmoved.append(board.unmoved)
+                    leaves.append((i, board.hash))
+            board.unmake_move(record)
+        if leaves:
+            stats = self.stats
+            start = time.perf_counter()
+            pawns = None
+            if self.pawn_structure:
+                #white and black pawns are the first and seventh piece bitboards
+                pawns = [self.get_pawn_heuristic((pieces[0], pieces[6])) for pieces in bitboards]
+            values = self.evaluate_batch(bitboards, unmoved, self.color, pawns).tolist()
+            if stats is not None:
+                stats.leaves += len(leaves)
+                stats.times["eval"] += time.perf_counter() - start
+            for (i, key), value in zip(leaves, values):
+                scores[i] = value
+                if cache is not None:
+                    cache.store(key, value)
+        pick = max if color == self.color else min
+        best = pick(range(len(moves)), key=scores.__getitem__)
+        if self.tt is not None:
+            self.tt.store(board.hash ^ self.tt_salt, 1, *self.to_tt(EXACT, scores[best], ply), moves[best])
+        return moves[best], scores[best]
+
+    def quiesce(self, board, color, alpha, beta, ply):
+        #search captures and promotions until the position is quiet, so a leaf is never scored in the
+        #middle of an exchange; the side to move may stand pat on the static score unless in check
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % TIME_CHECK_NODES == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if board.get_king_pos(color) is None:
+            return self.mate_score(color, ply)
+        maximizing = color == self.color
+        in_check = board.in_check(color)
+        if in_check:
+            stand_pat = float('-inf') if maximizing else float('inf')
+            moves = board.legal_moves(color)
+            if not moves:
+                return self.mate_score(color, ply)
+        else:
+            #material first, the mobility term only decides scores close to the window
+            material = self.get_board_heuristic(board)
+            if maximizing and material - LAZY_MARGIN >= beta:
+                return material - LAZY_MARGIN
+            if not maximizing and material + LAZY_MARGIN <= alpha:
+                return material + LAZY_MARGIN
+            stats = self.stats
+            stand_pat = stats.evaluate(self, board) if stats is not None else self.get_heuristic(board)
+            if maximizing:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+            moves = board.legal_moves(color, quiet=False)
+        next_color = "white" if color == "black" else "black"
+        best = stand_pat
+        for move in self.orderer.order(board, moves, ply):
+            if not in_check:
+                attacker = board.piece_info(move[0])[1]
+                victim = board.piece_info(move[1])
+                gain = PIECE_VALUES[victim[1]] if victim is not None else 0
+                if attacker == "Pawn" and move[1][0] in (0, 7):
+                    gain += PIECE_VALUES["Queen"] - PIECE_VALUES["Pawn"]
+                #delta pruning: even winning the piece outright leaves the score outside the window
+                if maximizing and stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+                if not maximizing and stand_pat - gain - DELTA_MARGIN >= beta:
+                    continue
+                #only a capture with a more valuable piece than the victim can lose material
+                if self.see_pruning and victim is not None and PIECE_VALUES[attacker] > gain and see(board, move) < 0:
+                    continue
+            record = board.make_move(move[0], move[1])
+            score = self.quiesce(board, next_color, alpha, beta, ply + 1)
+            board.unmake_move(record)
+            if maximizing:
+                best = max(best, score)
+                alpha = max(alpha, score)
+            else:
+                best = min(best, score)
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+        return best
+
+    def is_quiet(self, board, move):
+        #neither a capture nor a promotion
+        if board.piece_info(move[1]) is not None:
+            return False
+        return board.piece_info(move[0])[1] != "Pawn" or move[1][0] not in (0, 7)
+
+    def mate_score(self, color, ply):
+        #score when color is mated (or has lost its king) ply plies from the root
+        return -(MATE_SCORE - ply) if color == self.color else MATE_SCORE - ply
+
+    def to_tt(self, bound, score, ply=0):
+        #the table is shared by both players, so scores are stored from white's side
+        #mate scores are stored as distance from the node instead of from the root
+        if is_mate_score(score):
+            score = score + ply if score > 0 else score - ply
+        if self.color == "white":
+            return bound, score
+        if bound != EXACT:
+            bound = LOWER_BOUND if bound == UPPER_BOUND else UPPER_BOUND
+        return bound, -score
+
+    def from_tt(self, bound, score, ply=0):
+        #converting from white's side is the same flip as converting to it
+        bound, score = self.to_tt(bound, score)
+        if is_mate_score(score):
+            score = score - ply if score > 0 else score + ply
+        return bound, score
+
+    def iterative_deepening(self, board, time_limit, max_depth=MAX_DEPTH):
+        #search depth 1, 2, 3... until time_limit seconds are used or max_depth is done, returns the last
+        #finished result; with no time_limit every depth up to max_depth is searched
+        start = time.perf_counter()
+        best = None, None
+        for depth in range(1, max_depth + 1):
+            #depth 1 always finishes so there is a move to play
+            self.deadline = start + time_limit if depth > 1 and time_limit is not None else None
+            iteration_start = time.perf_counter()
+            nodes = self.nodes
+            try:
+                best = self.aspiration_search(board, depth, best)
+            except SearchTimeout:
+                #the aborted iteration left moves made on the scratch board, it is thrown away
+                if self.stats is not None:
+                    self.stats.depths.append((depth, self.nodes - nodes, time.perf_counter() - iteration_start, False, None))
+                break
+            finally:
+                self.deadline = None
+            if self.stats is not None:
+                self.stats.depths.append((depth, self.nodes - nodes, time.perf_counter() - iteration_start, True, best[1]))
+            if best[0] is None or is_mate_score(best[1]):
+                break
+            #the next iteration costs several times this one, do not start what cannot finish
+            now = time.perf_counter()
+            if time_limit is not None and now + 2*(now - iteration_start) > start + time_limit:
+                break
+        return best
+
+    def aspiration_search(self, board, depth, previous):
+        #search around the previous iteration's score and open the window on the side it fails
+        alpha, beta = float('-inf'), float('inf')
+        if self.aspiration and previous[0] is not None and not is_mate_score(previous[1]):
+            alpha, beta = previous[1] - ASPIRATION_WINDOW, previous[1] + ASPIRATION_WINDOW
+        while True:
+            best = self.search_root(board, depth, previous[0], alpha, beta)
+            if best[0] is None:
+                return best
+            if best[1] <= alpha:
+                alpha = float('-inf')
+            elif best[1] >= beta:
+                beta = float('inf')
+            else:
+                return best
+
+    def search_root(self, board, depth, first_move=None, alpha=float('-inf'), beta=float('inf')):
+        #one search from the root, split over worker processes if there are any
+        self.history = set(getattr(self.game, "history", ()))
+        if self.parallel is None:
+            return self.minimax(board, depth, self.color, alpha, beta, first_move=first_move)
+        deadline = None
+        if self.deadline is not None:
+            deadline = time.time() + self.deadline - time.perf_counter()
+        return self.parallel.search(board, depth, first_move, deadline, alpha, beta)
 
     def get_move(self):
         raise NotImplementedError("get_move() not implemented")
@@ -80,13 +473,41 @@ class Player:
         return input()
     
     def _auto_play(self):
-        action = self.minimax(self.game.board, 3, self.color, float('-inf'), float('inf'))[0]
+        #search walks one scratch board with make/unmake, the live board is never touched
+        stats = self.stats
+        if stats is not None:
+            stats.reset()
+            start = time.perf_counter()
+            nodes = self.nodes
+            tt = self.parallel if self.parallel is not None else self.tt
+            probes, hits = (tt.probes, tt.hits) if tt is not None else (0, 0)
+            caches = {name: cache for name, cache in (("eval", self.eval_cache), ("pawn", self.pawn_table)) if cache is not None}
+            cache_counts = {name: (cache.probes, cache.hits) for name, cache in caches.items()}
+        board = self.game.board.copy()
+        if stats is not None:
+            stats.times["copy"] += time.perf_counter() - start
+        if self.tt is not None:
+            self.tt.new_search()
+        self.orderer.new_search()
+        if self.time_limit is None:
+            action, score = self.search_root(board, self.depth)
+            if stats is not None:
+                stats.depths.append((self.depth, self.nodes - nodes, time.perf_counter() - start, True, score))
+        else:
+            action = self.iterative_deepening(board, self.time_limit)[0]
+        if stats is not None:
+            if tt is not None:
+                stats.tt_probes, stats.tt_hits = tt.probes - probes, tt.hits - hits
+            for name, cache in caches.items():
+                stats.caches[name] = (cache.probes - cache_counts[name][0], cache.hits - cache_counts[name][1])
+            self.last_stats = stats.record(self.nodes - nodes, time.perf_counter() - start)
         str_action = self.game.convert_coords_to_str(action[0]), self.game.convert_coords_to_str(action[1])
         return " ".join(str_action)
         
 class AIPlayer(Player):
-    def __init__(self, name, color, game):
-        super().__init__(name, color, game)
+    def __init__(self, name, color, game, depth=3, time_limit=None, orderer=None, workers=1, selective=(),
+            eval_cache_mb=0, pawn_table_mb=0):
+        super().__init__(name, color, game, depth, time_limit, orderer, workers, selective, eval_cache_mb, pawn_table_mb)
     
     def get_move(self):
         return self._auto_play()
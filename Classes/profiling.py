@@ -0,0 +1,34 @@
+import os
+import signal
+from collections import Counter
+
+class StackSampler:
+    #samples the python call stack every interval seconds of cpu time (SIGPROF, unix only)
+    #and counts each stack, written out as collapsed stacks for flamegraph.pl or speedscope
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self.old_handler = None
+
+    def sample(self, signum, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            names.append(f"{os.path.basename(code.co_filename)}:{name}")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self.old_handler = signal.signal(signal.SIGPROF, self.sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self.old_handler)
+
+    def write(self, path):
+        #one "outer;...;inner count" line per distinct stack
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,65 @@
+import time
+
+class SearchStats:
+    #counters for one AI move, a player only collects them when its stats is not None
+    #with a parallel search the cutoff, leaf, timing and eval cache counters only cover the root process
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.leaves = 0
+        self.cutoffs = 0
+        #cutoffs caused by the first move searched, high means move ordering works
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        #(probes, hits) of the player's eval cache and pawn structure table
+        self.caches = {"eval": (0, 0), "pawn": (0, 0)}
+        #seconds spent generating moves, evaluating leaves and copying the board
+        self.times = {"movegen": 0.0, "eval": 0.0, "copy": 0.0}
+        #(depth, nodes, seconds, finished, score) for every iteration, the last one may have run out of time
+        #and then has no score
+        self.depths = []
+
+    def evaluate(self, player, board):
+        self.leaves += 1
+        start = time.perf_counter()
+        score = player.get_heuristic(board)
+        self.times["eval"] += time.perf_counter() - start
+        return score
+
+    def timed_moves(self, moves):
+        #yields the same moves, adding the time spent producing each one to movegen
+        moves = iter(moves)
+        while True:
+            start = time.perf_counter()
+            move = next(moves, None)
+            self.times["movegen"] += time.perf_counter() - start
+            if move is None:
+                return
+            yield move
+
+    def cutoff(self, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+    def record(self, nodes, seconds):
+        #one JSON-ready dict for the move, nodes and seconds cover the whole search
+        return {
+            "nodes": nodes,
+            "seconds": round(seconds, 6),
+            "nps": round(nodes / seconds) if seconds else 0,
+            "leaves": self.leaves,
+            "cutoffs": self.cutoffs,
+            "first_move_cutoffs": self.first_move_cutoffs,
+            "first_move_cutoff_rate": round(self.first_move_cutoffs / self.cutoffs, 4) if self.cutoffs else 0.0,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": round(self.tt_hits / self.tt_probes, 4) if self.tt_probes else 0.0,
+            **{f"{name}_{key}": value for name, (probes, hits) in self.caches.items() for key, value in
+                (("probes", probes), ("hits", hits), ("hit_rate", round(hits / probes, 4) if probes else 0.0))},
+            "times": {name: round(value, 6) for name, value in self.times.items()},
+            "depths": [{"depth": depth, "nodes": n, "seconds": round(s, 6), "finished": finished, "score": score}
+                for depth, n, s, finished, score in self.depths],
+        }
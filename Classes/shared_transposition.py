@@ -0,0 +1,116 @@
+import struct
+from multiprocessing import shared_memory
+from .encoding import pack_move, unpack_move
+
+#one entry is three 64-bit words: check, data, score
+#check = key ^ data ^ score bits, so an entry half-written by another process fails the key test
+#data = depth (8 bits) | bound (2) | age (8) | packed move (16, see encoding.pack_move) | used (1)
+USED = 1 << 34
+ENTRY_WORDS = 3
+ENTRY_BYTES = ENTRY_WORDS*8
+#word 0 of the block holds the search age shared by every process
+HEADER_WORDS = 1
+
+def _double_bits(score):
+    return struct.unpack("<Q", struct.pack("<d", score))[0]
+
+def pack_data(depth, bound, age, move):
+    return min(depth, 255) | bound << 8 | (age & 255) << 10 | pack_move(move) << 18 | USED
+
+def unpack_data(data):
+    #(depth, bound, age, move)
+    return data & 255, data >> 8 & 3, data >> 10 & 255, unpack_move(data >> 18 & 0xFFFF)
+
+class SharedTranspositionTable:
+    #same interface as TranspositionTable, but the entries live in a shared memory block that
+    #any number of search processes on the machine can read and write without locks
+    shared = True
+
+    def __init__(self, size_mb=16, name=None):
+        self.size_mb = size_mb
+        self.size = max(1, int(size_mb*1024*1024) // ENTRY_BYTES)
+        nbytes = (HEADER_WORDS + self.size*ENTRY_WORDS)*8
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=nbytes)
+            self.owner = True
+        else:
+            #only the creating process unlinks the block
+            self.memory = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.words = self.memory.buf.cast("Q")
+        self.scores = self.memory.buf.cast("d")
+        self.hits = 0
+        self.probes = 0
+        self.torn = 0
+
+    def __getstate__(self):
+        #other processes get a handle to the same block
+        return {"size_mb": self.size_mb, "name": self.memory.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["size_mb"], state["name"])
+
+    @property
+    def age(self):
+        return self.words[0]
+
+    def new_search(self):
+        self.words[0] = (self.words[0] + 1) & 255
+
+    def probe(self, key):
+        #returns (key, depth, bound, score, move, age) like TranspositionTable, or None
+        self.probes += 1
+        base = HEADER_WORDS + (key % self.size)*ENTRY_WORDS
+        data = self.words[base + 1]
+        score_bits = self.words[base + 2]
+        if data == 0 or self.words[base] ^ data ^ score_bits != key & 0xFFFFFFFFFFFFFFFF:
+            return None
+        score = self.scores[base + 2]
+        #re-read: a writer between the loads would change the words
+        if self.words[base + 1] != data or self.words[base + 2] != score_bits:
+            self.torn += 1
+            return None
+        self.hits += 1
+        depth, bound, age, move = unpack_data(data)
+        return (key, depth, bound, score, move, age)
+
+    def store(self, key, depth, bound, score, move):
+        key &= 0xFFFFFFFFFFFFFFFF
+        base = HEADER_WORDS + (key % self.size)*ENTRY_WORDS
+        data = self.words[base + 1]
+        age = self.words[0]
+        if data:
+            same = self.words[base] ^ data ^ self.words[base + 2] == key
+            old_depth, _, old_age, old_move = unpack_data(data)
+            if not (same or old_age != age or depth >= old_depth):
+                return
+            if move is None and same:
+                move = old_move
+        data = pack_data(depth, bound, age, move)
+        score_bits = _double_bits(score)
+        self.words[base + 1] = data
+        self.scores[base + 2] = score
+        self.words[base] = key ^ data ^ score_bits
+
+    def clear(self):
+        self.memory.buf[:len(self.words)*8] = bytes(len(self.words)*8)
+        self.hits = 0
+        self.probes = 0
+        self.torn = 0
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def close(self):
+        #release this process's view, the creating process also removes the block
+        if self.memory is None:
+            return
+        self.words.release()
+        self.scores.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+        self.memory = None
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,47 @@
+#bound types of a stored score
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+#rough size of one python entry (tuple + ints + list slot), used to turn MB into slots
+ENTRY_BYTES = 160
+
+class TranspositionTable:
+    def __init__(self, size_mb=16):
+        self.size_mb = size_mb
+        self.size = max(1, int(size_mb*1024*1024) // ENTRY_BYTES)
+        #entries are (key, depth, bound, score, move, age)
+        self.entries = [None]*self.size
+        self.age = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self):
+        #entries from earlier searches become replaceable but stay usable
+        self.age += 1
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, bound, score, move):
+        index = key % self.size
+        entry = self.entries[index]
+        #depth preferred, but anything from an older search or the same position is replaced
+        if entry is None or entry[0] == key or entry[5] != self.age or depth >= entry[1]:
+            if move is None and entry is not None and entry[0] == key:
+                move = entry[4]
+            self.entries[index] = (key, depth, bound, score, move, self.age)
+
+    def clear(self):
+        self.entries = [None]*self.size
+        self.age = 0
+        self.hits = 0
+        self.probes = 0
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
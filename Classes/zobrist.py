@@ -0,0 +1,28 @@
+import random
+
+#zobrist keys, fixed seed so hashes are stable between runs and processes
+_rng = random.Random(3700)
+COLORS = ("white", "black")
+NAMES = ("Pawn", "Knight", "Bishop", "Rook", "Queen", "King")
+PIECE_KEYS = {(color, name): [_rng.getrandbits(64) for _ in range(64)] for color in COLORS for name in NAMES}
+#pawns, rooks and kings that still have their first move (double push and castling rights)
+FIRST_MOVE_KEYS = [_rng.getrandbits(64) for _ in range(64)]
+#xored in on every move, boards are parsed with white to move
+SIDE_KEY = _rng.getrandbits(64)
+#xored into transposition table keys by players whose evaluation has these switched on, so players that
+#score positions differently never read each other's entries from a shared table
+EVAL_KEYS = {name: _rng.getrandbits(64) for name in ("quiescence", "see", "pawn_structure")}
+
+def piece_hash(piece, position):
+    return PIECE_KEYS[(piece.color, piece.name)][position[0]*8 + position[1]]
+
+def hash_board(board):
+    #full hash of a Board with white to move, make_move keeps it up to date afterwards
+    h = 0
+    for piece in board.get_pieces():
+        h ^= piece_hash(piece, piece.position)
+    unmoved = board.unmoved
+    for sq in range(64):
+        if unmoved >> sq & 1:
+            h ^= FIRST_MOVE_KEYS[sq]
+    return h
@@ -117,4 +117,7 @@ init_board_repr_9 = [
     ["__", "__", "__", "__", "__", "wQ", "__", "__"],
     ["wP", "wP", "wP", "wP", "__", "wP", "wP", "wP"],
     ["wR", "__", "wB", "__", "wK", "wB", "wN", "wR"]
-]
\ No newline at end of file
+]
+
+#every board above by variable name
+POSITIONS = {name: value for name, value in list(globals().items()) if isinstance(value, list)}
@@ -0,0 +1,338 @@
+import argparse
+import time
+from Classes.board import Board
+from Classes.bitboard import BitBoard
+from Setup.init_board_reprs import POSITIONS
+from game import Game
+from Classes.players import AIPlayer, PRUNING, QUIESCENCE, is_mate_score
+from Classes.search_stats import SearchStats
+from Classes.move_ordering import MoveOrderer, SOURCES
+
+BOARDS = {"board": Board, "bitboard": BitBoard}
+
+def time_call(fn, repeat):
+    #average seconds per call
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def bench_board(board_cls, repeat):
+    print(f"{board_cls.__name__}: microseconds per call")
+    print(f"{'position':<20}{'action_space':>14}{'in_check':>10}{'mate+stalemate':>16}")
+    totals = [0, 0, 0]
+    for name, board_repr in POSITIONS.items():
+        game = Game(init_board_repr=board_repr, board_cls=board_cls, tt_size_mb=0)
+        board = game.board
+        moves = time_call(lambda: (board.action_space("white"), board.action_space("black")), repeat) / 2
+        check = time_call(lambda: (board.in_check("white"), board.in_check("black")), repeat) / 2
+        terminal = time_call(lambda: (game.check_for_mate("white"), game.check_for_stalemate("white")), repeat)
+        totals[0] += moves
+        totals[1] += check
+        totals[2] += terminal
+        print(f"{name:<20}{moves*1e6:>14.1f}{check*1e6:>10.1f}{terminal*1e6:>16.1f}")
+    print(f"{'total':<20}{totals[0]*1e6:>14.1f}{totals[1]*1e6:>10.1f}{totals[2]*1e6:>16.1f}")
+
+def search_nodes(board_repr, board_cls, depth, orderer, tt_size_mb=0):
+    #nodes minimax visits for one fixed-depth white search from board_repr
+    game = Game(init_board_repr=board_repr, board_cls=board_cls, tt_size_mb=tt_size_mb)
+    player = AIPlayer("bench", "white", game, depth=depth, orderer=orderer)
+    game.white_player = game.black_player = player
+    start = time.perf_counter()
+    player.minimax(game.board.copy(), depth, "white", float('-inf'), float('inf'))
+    return player.nodes, time.perf_counter() - start
+
+def bench_ordering(board_cls, depth):
+    #effective branching factor is nodes ** (1/depth)
+    configs = [("unordered", ()), ("captures", ("captures", "promotions")), ("all", SOURCES)]
+    print(f"{board_cls.__name__}: nodes (effective branching factor) at depth {depth}, no transposition table")
+    print(f"{'position':<20}" + "".join(f"{name:>22}" for name, _ in configs))
+    totals = [0]*len(configs)
+    for name, board_repr in POSITIONS.items():
+        row = f"{name:<20}"
+        for i, (_, sources) in enumerate(configs):
+            nodes, _ = search_nodes(board_repr, board_cls, depth, MoveOrderer(sources))
+            totals[i] += nodes
+            row += f"{nodes:>14} ({nodes ** (1/depth):5.1f})"
+        print(row)
+    print(f"{'total':<20}" + "".join(f"{total:>22}" for total in totals))
+
+def bench_parallel(board_cls, depth, worker_counts):
+    #wall time of one fixed-depth white search per position, pool start-up excluded
+    print(f"{board_cls.__name__}: seconds per depth {depth} search (speedup over 1 worker)")
+    print(f"{'position':<20}" + "".join(f"{str(workers) + ' workers':>20}" for workers in worker_counts))
+    totals = [0.0]*len(worker_counts)
+    players = []
+    for workers in worker_counts:
+        game = Game(init_board_repr=POSITIONS["starting_board"], board_cls=board_cls)
+        player = AIPlayer("bench", "white", game, depth=depth, workers=workers)
+        if player.parallel is not None:
+            player.parallel.start()
+        players.append(player)
+    for name, board_repr in POSITIONS.items():
+        row = f"{name:<20}"
+        times = []
+        for i, player in enumerate(players):
+            player.game.board = board_cls(board_repr)
+            player.game.history = [player.game.board.hash]
+            start = time.perf_counter()
+            player.search_root(player.game.board.copy(), depth)
+            times.append(time.perf_counter() - start)
+            totals[i] += times[-1]
+            row += f"{times[-1]:>12.3f} ({times[0] / times[-1]:4.1f}x)"
+        print(row)
+    print(f"{'total':<20}" + "".join(f"{total:>12.3f} ({totals[0] / total:4.1f}x)" for total in totals))
+    for player in players:
+        if player.parallel is not None:
+            player.parallel.close()
+
+def bench_shared_tt(board_cls, depth, workers):
+    #the same parallel search with a private table per worker and with one shared table
+    print(f"{board_cls.__name__}: depth {depth} search with {workers} workers, nodes (tt hit rate)")
+    print(f"{'position':<20}{'private tables':>24}{'shared table':>24}{'nodes saved':>14}")
+    players = []
+    for shared_tt in (False, True):
+        game = Game(init_board_repr=POSITIONS["starting_board"], board_cls=board_cls, shared_tt=shared_tt)
+        player = AIPlayer("bench", "white", game, depth=depth, workers=workers)
+        player.parallel.start()
+        players.append(player)
+    totals = [0, 0]
+    for name, board_repr in POSITIONS.items():
+        row = f"{name:<20}"
+        nodes = []
+        for i, player in enumerate(players):
+            parallel = player.parallel
+            parallel.probes = parallel.hits = player.nodes = 0
+            player.game.board = board_cls(board_repr)
+            player.game.history = [player.game.board.hash]
+            player.game.tt.new_search()
+            player.search_root(player.game.board.copy(), depth)
+            nodes.append(player.nodes)
+            totals[i] += player.nodes
+            row += f"{player.nodes:>15} ({parallel.hit_rate():6.1%})"
+        print(row + f"{1 - nodes[1] / nodes[0]:>14.1%}")
+    print(f"{'total':<20}{totals[0]:>24}{totals[1]:>24}{1 - totals[1] / totals[0]:>14.1%}")
+    for player in players:
+        player.parallel.close()
+        if hasattr(player.game.tt, "close"):
+            player.game.tt.close()
+
+def bench_selective(board_cls, depth):
+    #iterative deepening to depth with each selective technique alone and all of them, against the plain
+    #search; every run gets a fresh transposition table so hash moves and aspiration have something to use
+    configs = [("plain", ())] + [(name, (name,)) for name in PRUNING] + [("all", PRUNING)]
+    print(f"{board_cls.__name__}: nodes and seconds of a depth {depth} search, * marks a best move different from plain")
+    print(f"{'position':<20}" + "".join(f"{name:>20}" for name, _ in configs))
+    totals = [[0, 0.0, 0] for _ in configs]
+    for name, board_repr in POSITIONS.items():
+        row = f"{name:<20}"
+        plain_move = None
+        for i, (_, selective) in enumerate(configs):
+            game = Game(init_board_repr=board_repr, board_cls=board_cls)
+            player = AIPlayer("bench", "white", game, depth=depth, selective=selective)
+            start = time.perf_counter()
+            move = player.iterative_deepening(game.board.copy(), None, depth)[0]
+            seconds = time.perf_counter() - start
+            if i == 0:
+                plain_move = move
+            differs = move != plain_move
+            totals[i][0] += player.nodes
+            totals[i][1] += seconds
+            totals[i][2] += differs
+            row += f"{player.nodes:>11}{'*' if differs else ' '}{seconds:>7.2f}s"
+        print(row)
+    print(f"{'total':<20}" + "".join(f"{nodes:>11} {seconds:>7.2f}s" for nodes, seconds, _ in totals))
+    print(f"{'vs plain':<20}" + "".join(f"{nodes / totals[0][0]:>11.0%} {seconds / totals[0][1]:>7.0%} "
+        for nodes, seconds, _ in totals))
+    print(f"{'moves changed':<20}" + "".join(f"{changed:>20}" for _, _, changed in totals))
+
+def deepen(board_repr, board_cls, selective, depth=64, time_limit=None):
+    #iterative deepening for white from board_repr, returns (move, nodes, seconds, scores of the finished iterations)
+    game = Game(init_board_repr=board_repr, board_cls=board_cls)
+    player = AIPlayer("bench", "white", game, depth=depth, selective=selective)
+    player.stats = SearchStats()
+    start = time.perf_counter()
+    move = player.iterative_deepening(game.board.copy(), time_limit, depth)[0]
+    seconds = time.perf_counter() - start
+    return move, player.nodes, seconds, [entry[4] for entry in player.stats.depths if entry[3]]
+
+def bench_quiescence(board_cls, depth, time_limit):
+    #tactical stability: swing is how far the score moved in the last iteration, a search that stops in the
+    #middle of exchanges swings between depths; ok marks a move that agrees with a quiescence search one
+    #ply deeper. The first table is at fixed depth, with plain depth + 1 as the other way to see further,
+    #the second gives every search the same time
+    reference = {name: deepen(board_repr, board_cls, QUIESCENCE, depth + 1)[0] for name, board_repr in POSITIONS.items()}
+    fixed = [("plain", (), depth), (f"plain depth {depth + 1}", (), depth + 1),
+        ("quiescence", ("quiescence",), depth), ("quiescence+see", QUIESCENCE, depth)]
+    timed = [("plain", ()), ("quiescence", ("quiescence",)), ("quiescence+see", QUIESCENCE)]
+    for title, configs in ((f"depth {depth}", fixed), (f"{time_limit}s per search", timed)):
+        print(f"{board_cls.__name__}, {title}: nodes, seconds, depth reached, score swing and agreement with the reference move")
+        print(f"{'position':<20}" + "".join(f"{config[0]:>32}" for config in configs))
+        totals = [[0, 0.0, 0.0, 0] for _ in configs]
+        for name, board_repr in POSITIONS.items():
+            row = f"{name:<20}"
+            for i, config in enumerate(configs):
+                if len(config) == 3:
+                    move, nodes, seconds, scores = deepen(board_repr, board_cls, config[1], config[2])
+                else:
+                    move, nodes, seconds, scores = deepen(board_repr, board_cls, config[1], time_limit=time_limit)
+                swing = abs(scores[-1] - scores[-2]) if len(scores) > 1 and not is_mate_score(scores[-1]) else 0.0
+                ok = move == reference[name]
+                totals[i][0] += nodes
+                totals[i][1] += seconds
+                totals[i][2] += swing
+                totals[i][3] += ok
+                row += f"{nodes:>9}{seconds:>7.2f}s d{len(scores):<2}{swing:>7.0f}{' ok' if ok else '   '}"
+            print(row)
+        print(f"{'total':<20}" + "".join(f"{nodes:>9}{seconds:>7.2f}s    {swing:>7.0f}{ok:>3}" for nodes, seconds, swing, ok in totals))
+        print()
+
+def bench_batch_eval(board_cls, count, depth):
+    #Player.get_heuristic one board at a time against batch_eval on batches of growing size, then the
+    #search with and without batch_eval scoring depth 1 nodes
+    from Classes import batch_eval
+    from Tools.evaluate import random_positions
+    boards = random_positions(board_cls, count, 60, 0)
+    player = AIPlayer("bench", "white", None)
+    start = time.perf_counter()
+    scalar = [player.get_heuristic(board) for board in boards]
+    scalar_rate = len(boards) / (time.perf_counter() - start)
+    bitboards, unmoved = batch_eval.from_boards(boards)
+    mismatches = int((batch_eval.evaluate_bitboards(bitboards, unmoved, "white") != scalar).sum())
+    print(f"{board_cls.__name__}: {len(boards)} positions from random games, {mismatches} scores differ from get_heuristic")
+    print(f"{'batch size':<20}{'positions/s':>14}{'vs scalar':>11}")
+    print(f"{'scalar':<20}{scalar_rate:>14.0f}{1:>10.1f}x")
+    for size in (1, 30, 1000, len(boards)):
+        start = time.perf_counter()
+        for i in range(0, len(boards), size):
+            batch_eval.evaluate_bitboards(bitboards[i:i + size], unmoved[i:i + size], "white")
+        rate = len(boards) / (time.perf_counter() - start)
+        print(f"{size:<20}{rate:>14.0f}{rate / scalar_rate:>10.1f}x")
+    print(f"depth {depth} search, seconds (same score as the plain search)")
+    totals = [0.0, 0.0]
+    for name, board_repr in POSITIONS.items():
+        results = []
+        for i, selective in enumerate(((), ("batch_eval",))):
+            game = Game(init_board_repr=board_repr, board_cls=board_cls, tt_size_mb=0)
+            searcher = AIPlayer("bench", "white", game, depth=depth, selective=selective)
+            start = time.perf_counter()
+            results.append(searcher.search_root(game.board.copy(), depth))
+            totals[i] += time.perf_counter() - start
+        print(f"{name:<20}{'same' if results[0][1] == results[1][1] else 'DIFFERENT'}")
+    print(f"{'plain':<20}{totals[0]:>8.2f}s")
+    print(f"{'batch_eval':<20}{totals[1]:>8.2f}s")
+
+def bench_batch_moves(board_cls, count):
+    #legal_moves one board at a time against batch_moves on batches of growing size, for both colors
+    from Classes import batch_eval, batch_moves
+    from Classes.encoding import pack_move
+    from Tools.evaluate import random_positions
+    boards = random_positions(board_cls, count, 60, 0)
+    bitboards, unmoved = batch_eval.from_boards(boards)
+    start = time.perf_counter()
+    scalar = {color: [board.legal_moves(color) for board in boards] for color in ("white", "black")}
+    scalar_rate = 2*len(boards) / (time.perf_counter() - start)
+    mismatches = 0
+    for color in ("white", "black"):
+        moves, offsets = batch_moves.legal_moves(bitboards, unmoved, color)
+        for i, board in enumerate(boards):
+            expected = sorted(pack_move(move, board) for move in scalar[color][i])
+            mismatches += expected != sorted(moves[offsets[i]:offsets[i + 1]].tolist())
+    print(f"{board_cls.__name__}: {len(boards)} positions from random games, {mismatches} move lists differ from legal_moves")
+    print(f"{'batch size':<20}{'positions/s':>14}{'vs scalar':>11}")
+    print(f"{'scalar':<20}{scalar_rate:>14.0f}{1:>10.1f}x")
+    for size in (1, 30, 1000, len(boards)):
+        start = time.perf_counter()
+        for color in ("white", "black"):
+            for i in range(0, len(boards), size):
+                batch_moves.legal_moves(bitboards[i:i + size], unmoved[i:i + size], color)
+        rate = 2*len(boards) / (time.perf_counter() - start)
+        print(f"{size:<20}{rate:>14.0f}{rate / scalar_rate:>10.1f}x")
+
+def bench_eval_cache(board_cls, depth, eval_mb, pawn_mb):
+    #iterative deepening to depth with the pawn structure term on, without caches, with the eval cache and with
+    #both caches; the caches only store what the evaluation returned, so every score must be the same
+    configs = [("no cache", 0, 0), ("eval cache", eval_mb, 0), ("eval+pawn", eval_mb, pawn_mb)]
+    print(f"{board_cls.__name__}: seconds of a depth {depth} search and eval/pawn hit rates, * marks different scores")
+    print(f"{'position':<20}" + "".join(f"{name:>26}" for name, _, _ in configs))
+    totals = [0.0 for _ in configs]
+    for name, board_repr in POSITIONS.items():
+        row = f"{name:<20}"
+        plain = None
+        for i, (_, eval_cache_mb, pawn_table_mb) in enumerate(configs):
+            game = Game(init_board_repr=board_repr, board_cls=board_cls)
+            player = AIPlayer("bench", "white", game, depth=depth, selective=("pawn_structure",),
+                eval_cache_mb=eval_cache_mb, pawn_table_mb=pawn_table_mb)
+            player.stats = SearchStats()
+            start = time.perf_counter()
+            move = player.iterative_deepening(game.board.copy(), None, depth)[0]
+            seconds = time.perf_counter() - start
+            result = (move, [entry[4] for entry in player.stats.depths])
+            if i == 0:
+                plain = result
+            totals[i] += seconds
+            rates = [cache.hit_rate() if cache is not None else 0.0 for cache in (player.eval_cache, player.pawn_table)]
+            row += f"{'*' if result != plain else ' ':>2}{seconds:>8.2f}s {rates[0]:>6.0%} {rates[1]:>6.0%}"
+        print(row)
+    print(f"{'total':<20}" + "".join(f"{seconds:>11.2f}s{'':>14}" for seconds in totals))
+    print(f"{'vs no cache':<20}" + "".join(f"{seconds / totals[0]:>12.0%}{'':>14}" for seconds in totals))
+
+def main():
+    parser = argparse.ArgumentParser(description="engine benchmarks on the Setup positions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    board_parser = subparsers.add_parser("board", help="action_space and in_check timings")
+    board_parser.add_argument("--board", choices=BOARDS, default="board")
+    board_parser.add_argument("--repeat", type=int, default=200)
+    ordering_parser = subparsers.add_parser("ordering", help="node counts with and without move ordering")
+    ordering_parser.add_argument("--board", choices=BOARDS, default="board")
+    ordering_parser.add_argument("--depth", type=int, default=3)
+    parallel_parser = subparsers.add_parser("parallel", help="root search split over worker processes")
+    parallel_parser.add_argument("--board", choices=BOARDS, default="board")
+    parallel_parser.add_argument("--depth", type=int, default=3)
+    parallel_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    shared_parser = subparsers.add_parser("shared-tt", help="parallel search with private and shared transposition tables")
+    shared_parser.add_argument("--board", choices=BOARDS, default="board")
+    shared_parser.add_argument("--depth", type=int, default=3)
+    shared_parser.add_argument("--workers", type=int, default=4)
+    selective_parser = subparsers.add_parser("selective", help="pvs, aspiration windows, null move and lmr against the plain search")
+    selective_parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    selective_parser.add_argument("--depth", type=int, default=4)
+    quiescence_parser = subparsers.add_parser("quiescence", help="score stability of quiescence search against a deeper plain search")
+    quiescence_parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    quiescence_parser.add_argument("--depth", type=int, default=3)
+    quiescence_parser.add_argument("--time-limit", type=float, default=1.0)
+    batch_parser = subparsers.add_parser("batch-eval", help="NumPy batch evaluation against get_heuristic")
+    batch_parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    batch_parser.add_argument("--count", type=int, default=20000)
+    batch_parser.add_argument("--depth", type=int, default=3)
+    cache_parser = subparsers.add_parser("eval-cache", help="search time and hit rates with the eval cache and pawn table")
+    cache_parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    cache_parser.add_argument("--depth", type=int, default=4)
+    cache_parser.add_argument("--eval-mb", type=float, default=4)
+    cache_parser.add_argument("--pawn-mb", type=float, default=1)
+    moves_parser = subparsers.add_parser("batch-moves", help="NumPy batch move generation against legal_moves")
+    moves_parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    moves_parser.add_argument("--count", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.command == "board":
+        bench_board(BOARDS[args.board], args.repeat)
+    elif args.command == "ordering":
+        bench_ordering(BOARDS[args.board], args.depth)
+    elif args.command == "parallel":
+        bench_parallel(BOARDS[args.board], args.depth, args.workers)
+    elif args.command == "shared-tt":
+        bench_shared_tt(BOARDS[args.board], args.depth, args.workers)
+    elif args.command == "selective":
+        bench_selective(BOARDS[args.board], args.depth)
+    elif args.command == "quiescence":
+        bench_quiescence(BOARDS[args.board], args.depth, args.time_limit)
+    elif args.command == "batch-eval":
+        bench_batch_eval(BOARDS[args.board], args.count, args.depth)
+    elif args.command == "eval-cache":
+        bench_eval_cache(BOARDS[args.board], args.depth, args.eval_mb, args.pawn_mb)
+    elif args.command == "batch-moves":
+        bench_batch_moves(BOARDS[args.board], args.count)
+
+if __name__ == "__main__":
+    main()
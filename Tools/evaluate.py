@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+import numpy as np
+from Classes.encoding import encode_position, decode_position, POSITION_BYTES
+from Classes.batch_eval import decode_positions, evaluate
+from Classes.players import AIPlayer
+from Setup.init_board_reprs import POSITIONS
+from Tools.benchmark import BOARDS
+
+#offline scoring of position files: a file is encoding.encode_position records back to back
+
+def random_positions(board_cls, count, max_plies, seed):
+    #count boards from games of random legal moves on random Setup positions, every position of a game is kept
+    rng = random.Random(seed)
+    reprs = list(POSITIONS.values())
+    boards = []
+    while len(boards) < count:
+        board = board_cls(rng.choice(reprs))
+        color = "white"
+        for _ in range(max_plies):
+            moves = board.legal_moves(color)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            board.make_move(move[0], move[1])
+            color = "white" if color == "black" else "black"
+            #encode_position only fits 32 pieces
+            if len(board.get_pieces()) <= 32 and len(boards) < count:
+                boards.append(board.copy())
+    return boards
+
+def scalar_scores(data, count, color, board_cls):
+    #the first count positions of data through Player.get_heuristic, one board at a time
+    player = AIPlayer("scalar", color, None)
+    records = (data[i*POSITION_BYTES:(i + 1)*POSITION_BYTES] for i in range(count))
+    return np.array([player.get_heuristic(decode_position(record, board_cls)) for record in records])
+
+def generate(args):
+    start = time.perf_counter()
+    boards = random_positions(BOARDS[args.board], args.count, args.max_plies, args.seed)
+    with open(args.path, "wb") as f:
+        for board in boards:
+            f.write(encode_position(board))
+    print(f"wrote {len(boards)} positions to {args.path} in {time.perf_counter() - start:.1f}s")
+
+def score(args):
+    with open(args.path, "rb") as f:
+        data = f.read()
+    start = time.perf_counter()
+    squares, unmoved = decode_positions(data)
+    decoded = time.perf_counter()
+    scores = evaluate(squares, unmoved, args.color)
+    done = time.perf_counter()
+    print(f"{len(scores)} positions: decoded in {decoded - start:.3f}s, scored in {done - decoded:.3f}s "
+        f"({len(scores) / max(done - decoded, 1e-9):.0f} positions/s)")
+    print(f"score from {args.color}'s side: mean {scores.mean():.1f} min {scores.min():.1f} max {scores.max():.1f}")
+    if args.out:
+        np.save(args.out, scores)
+        print(f"scores in {args.out}")
+    if args.check:
+        #compare a sample with the scalar heuristic, the scores must be identical
+        count = min(args.check, len(scores))
+        expected = scalar_scores(data, count, args.color, BOARDS[args.board])
+        mismatches = int((expected != scores[:count]).sum())
+        print(f"checked {count} positions against Player.get_heuristic: {mismatches} mismatches")
+        if mismatches:
+            raise SystemExit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description="write and score files of packed positions with the NumPy evaluator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    generate_parser = subparsers.add_parser("generate", help="positions from random games on the Setup boards")
+    generate_parser.add_argument("path")
+    generate_parser.add_argument("--count", type=int, default=10000)
+    generate_parser.add_argument("--max-plies", type=int, default=60)
+    generate_parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    score_parser = subparsers.add_parser("score", help="evaluate every position in a file")
+    score_parser.add_argument("path")
+    score_parser.add_argument("--color", choices=("white", "black"), default="white")
+    score_parser.add_argument("--out", help="save the scores as a .npy file")
+    score_parser.add_argument("--check", type=int, default=0, help="compare the first n scores with the scalar heuristic")
+    score_parser.add_argument("--board", choices=BOARDS, default="bitboard", help="board used by --check")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args)
+    else:
+        score(args)
+
+if __name__ == "__main__":
+    main()
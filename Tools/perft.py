@@ -0,0 +1,126 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from Setup.init_board_reprs import POSITIONS
+from Tools.benchmark import BOARDS
+from Classes.fen import parse_fen
+
+#leaf counts for depth 1, 2, 3... under this engine's rules: promotion is always to a queen and
+#there is no en passant, so only counts those rules cannot reach yet match published perft numbers
+#Setup positions are searched with white to move and every pawn, rook and king still unmoved
+REFERENCE = {
+    "starting_board": [20, 400, 8902, 197281],
+    "stalemate": [1, 7, 25, 161],
+    "init_board_repr_1": [43, 893, 37021],
+    "init_board_repr_2": [15, 104, 1523, 11046],
+    "init_board_repr_3": [49, 408, 18699],
+    "init_board_repr_4": [22, 676, 16052],
+    "init_board_repr_5": [27, 781, 21126],
+    "init_board_repr_6": [21, 645, 14979],
+    "init_board_repr_7": [31, 1051, 31018],
+    "init_board_repr_8": [5, 250, 7863],
+    "init_board_repr_9": [42, 1563, 61192],
+}
+#published counts cut off before the first en passant or under-promotion
+FEN_REFERENCE = {
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1": [20, 400, 8902, 197281],
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1": [48],
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1": [14, 191],
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1": [6],
+}
+
+def perft(board, color, depth):
+    #number of leaf positions depth moves from here, the last ply is counted without being played
+    if depth == 0:
+        return 1
+    moves = board.legal_moves(color)
+    if depth == 1:
+        return len(moves)
+    next_color = "white" if color == "black" else "black"
+    nodes = 0
+    for move in moves:
+        record = board.make_move(move[0], move[1])
+        nodes += perft(board, next_color, depth - 1)
+        board.unmake_move(record)
+    return nodes
+
+def _divide_move(board, color, move, depth):
+    next_color = "white" if color == "black" else "black"
+    board.make_move(move[0], move[1])
+    return perft(board, next_color, depth - 1)
+
+def divide(board, color, depth, workers=1):
+    #{root move: leaf count below it}, root moves are split over worker processes if workers > 1
+    moves = board.legal_moves(color)
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as executor:
+            counts = executor.map(_divide_move, [board]*len(moves), [color]*len(moves), moves, [depth]*len(moves))
+            return dict(zip(moves, counts))
+    return {move: _divide_move(board.copy(), color, move, depth) for move in moves}
+
+def move_str(move):
+    #long algebraic like e2e4, row 0 is the eighth rank
+    return "".join(chr(ord("a") + col) + str(8 - row) for row, col in move)
+
+def run(name, board, color, depth, workers, show_divide, expected):
+    #prints one perft result, returns False if it does not match the expected count
+    start = time.perf_counter()
+    if depth == 0:
+        counts = {}
+        nodes = 1
+    else:
+        counts = divide(board, color, depth, workers)
+        nodes = sum(counts.values())
+    elapsed = time.perf_counter() - start
+    if show_divide:
+        for move, count in sorted(counts.items(), key=lambda item: move_str(item[0])):
+            print(f"  {move_str(move)}: {count}")
+    status = ""
+    if expected is not None:
+        status = "ok" if nodes == expected else f"FAILED, expected {expected}"
+    nps = nodes / elapsed if elapsed else 0
+    print(f"{name:<24} depth {depth}: {nodes:>10} nodes {elapsed:8.3f}s {nps:>10.0f} nps  {status}")
+    return expected is None or nodes == expected
+
+def check(board_cls, max_depth, workers):
+    #every stored reference up to max_depth, returns False if any count differs
+    passed = True
+    for name, counts in REFERENCE.items():
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            passed &= run(name, board_cls(POSITIONS[name]), "white", depth, workers, False, expected)
+    for fen, counts in FEN_REFERENCE.items():
+        for depth, expected in enumerate(counts[:max_depth], 1):
+            board, color = parse_fen(fen, board_cls)
+            passed &= run(fen.split()[0][:24], board, color, depth, workers, False, expected)
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description="count leaf nodes of the legal move tree to check and time move generation")
+    parser.add_argument("position", nargs="?", default="starting_board", choices=POSITIONS, help="board from Setup/init_board_reprs.py")
+    parser.add_argument("--fen", help="search this FEN instead of a Setup board")
+    parser.add_argument("--color", choices=("white", "black"), default="white", help="side to move for Setup boards")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--board", choices=BOARDS, default="board")
+    parser.add_argument("--divide", action="store_true", help="print the count below every root move")
+    parser.add_argument("--workers", type=int, default=1, help="split the root moves over this many processes")
+    parser.add_argument("--check", action="store_true", help="compare every stored reference count up to --depth")
+    args = parser.parse_args()
+
+    board_cls = BOARDS[args.board]
+    if args.check:
+        sys.exit(0 if check(board_cls, args.depth, args.workers) else 1)
+    if args.fen:
+        board, color = parse_fen(args.fen, board_cls)
+        expected = FEN_REFERENCE.get(args.fen, [])
+        name = args.fen.split()[0][:24]
+    else:
+        board, color = board_cls(POSITIONS[args.position]), args.color
+        expected = REFERENCE.get(args.position, []) if color == "white" else []
+        name = args.position
+    expected = expected[args.depth - 1] if 0 < args.depth <= len(expected) else None
+    if not run(name, board, color, args.depth, args.workers, args.divide, expected):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from game import Game
+from Classes.players import AIPlayer, SELECTIVE
+from Classes.transposition import TranspositionTable
+from Classes.move_ordering import MoveOrderer, SOURCES
+from Setup.init_board_reprs import POSITIONS
+from Tools.benchmark import BOARDS
+from Tools.perft import move_str
+
+#an engine is a dict of AIPlayer settings, given on the command line as name:key=value,key=value
+ENGINE_DEFAULTS = {"depth": 3, "time_limit": None, "tt_mb": 16, "ordering": SOURCES, "selective": (), "eval_mb": 0, "pawn_mb": 0}
+
+def parse_engine(spec):
+    #"fast:depth=2,ordering=captures+promotions" -> ("fast", settings), ordering=none turns ordering off
+    #and selective=pvs+lmr switches on selective search techniques
+    name, _, options = spec.partition(":")
+    engine = dict(ENGINE_DEFAULTS)
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        if key == "depth":
+            engine["depth"] = int(value)
+        elif key == "time_limit":
+            engine["time_limit"] = float(value)
+        elif key in ("tt_mb", "eval_mb", "pawn_mb"):
+            engine[key] = float(value)
+        elif key == "ordering":
+            engine["ordering"] = () if value == "none" else tuple(value.split("+"))
+        elif key == "selective":
+            engine["selective"] = () if value == "none" else tuple(value.split("+"))
+            unknown = set(engine["selective"]) - set(SELECTIVE)
+            if unknown:
+                raise ValueError(f"unknown selective technique {', '.join(sorted(unknown))} in {spec}")
+        else:
+            raise ValueError(f"unknown engine option {key} in {spec}")
+    return name, engine
+
+def make_player(name, color, game, engine):
+    player = AIPlayer(name, color, game, engine["depth"], engine["time_limit"], MoveOrderer(engine["ordering"]),
+        selective=engine["selective"], eval_cache_mb=engine["eval_mb"], pawn_table_mb=engine["pawn_mb"])
+    #every engine keeps its own table so neither reads the other's search
+    player.tt = TranspositionTable(engine["tt_mb"]) if engine["tt_mb"] else None
+    return player
+
+def random_opening(board_cls, board_repr, plies, seed):
+    #a few random legal moves from board_repr, the same seed always gives the same opening
+    rng = random.Random(seed)
+    board = board_cls(board_repr)
+    color, moves = "white", []
+    for _ in range(plies):
+        legal = board.legal_moves(color)
+        if not legal:
+            break
+        move = rng.choice(sorted(legal))
+        board.make_move(move[0], move[1])
+        moves.append(move)
+        color = "white" if color == "black" else "black"
+    return moves
+
+def play_game(task):
+    #plays one game with no output, returns a JSON-ready record
+    #the game ends on mate/stalemate, a draw by the move cap or threefold repetition, or is adjudicated
+    #as a win once one side is ahead by adjudicate_material for adjudicate_plies plies in a row
+    start = time.perf_counter()
+    game = Game(init_board_repr=POSITIONS[task["position"]], board_cls=BOARDS[task["board"]], tt_size_mb=0)
+    names = {"white": task["white"][0], "black": task["black"][0]}
+    game.white_player = make_player(names["white"], "white", game, task["white"][1])
+    game.black_player = make_player(names["black"], "black", game, task["black"][1])
+    board = game.board
+    moves = []
+    for move in task["opening"]:
+        board.move_piece(move[0], move[1], game.turn_color)
+        moves.append(move_str(move))
+        game.next_turn()
+    seen = {}
+    leader, lead_plies = None, 0
+    while True:
+        outcome = game.outcome()
+        if outcome is not None:
+            winner, reason = outcome
+            break
+        if game.ply >= task["max_plies"]:
+            winner, reason = None, "move cap"
+            break
+        #the hash includes the side to move
+        seen[board.hash] = seen.get(board.hash, 0) + 1
+        if seen[board.hash] >= 3:
+            winner, reason = None, "repetition"
+            break
+        diff = board.material("white") - board.material("black")
+        ahead = "white" if diff >= task["adjudicate_material"] else "black" if -diff >= task["adjudicate_material"] else None
+        lead_plies = lead_plies + 1 if ahead is not None and ahead == leader else 1
+        leader = ahead
+        if leader is not None and lead_plies >= task["adjudicate_plies"]:
+            winner, reason = leader, "adjudicated"
+            break
+        move = game.get_move()
+        move = game.convert_coords(move[:2]), game.convert_coords(move[3:5])
+        board.move_piece(move[0], move[1], game.turn_color)
+        moves.append(move_str(move))
+        game.next_turn()
+    result = "1/2-1/2" if winner is None else "1-0" if winner == "white" else "0-1"
+    return {
+        "game": task["game"],
+        "white": names["white"],
+        "black": names["black"],
+        "position": task["position"],
+        "opening_plies": len(task["opening"]),
+        "result": result,
+        "reason": reason,
+        "plies": game.ply,
+        "seconds": round(time.perf_counter() - start, 3),
+        "moves": " ".join(moves),
+    }
+
+def elo(wins, draws, losses):
+    #(elo difference, 95% error margin) from one side's results, inf when it won or lost everything
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, float("inf")
+    score = (wins + draws/2) / games
+    if score in (0, 1):
+        return (float("inf") if score else float("-inf")), float("inf")
+    variance = (wins*(1 - score)**2 + draws*(0.5 - score)**2 + losses*score**2) / games
+    margin = 1.96*math.sqrt(variance / games)
+
+    def to_elo(s):
+        if s <= 0:
+            return float("-inf")
+        if s >= 1:
+            return float("inf")
+        return -400*math.log10(1/s - 1)
+
+    low, high = to_elo(score - margin), to_elo(score + margin)
+    return to_elo(score), (high - low) / 2
+
+def make_tasks(engines, games, position, board, plies, max_plies, adjudicate_material, adjudicate_plies, seed):
+    #every pair of engines plays games games, each opening once with each engine as white
+    tasks = []
+    for first, second in itertools.combinations(engines, 2):
+        for i in range(games):
+            opening = random_opening(BOARDS[board], POSITIONS[position], plies, seed + i // 2)
+            white, black = (first, second) if i % 2 == 0 else (second, first)
+            tasks.append({"game": len(tasks), "white": white, "black": black, "position": position, "board": board,
+                "opening": opening, "max_plies": max_plies, "adjudicate_material": adjudicate_material,
+                "adjudicate_plies": adjudicate_plies})
+    return tasks
+
+def print_table(engines, records):
+    #win/draw/loss of the first engine of each pair and its elo difference to the second
+    print(f"{'pair':<30}{'games':>7}{'wins':>6}{'draws':>7}{'losses':>8}{'score':>8}{'elo':>16}{'sec/game':>10}")
+    for (first, _), (second, _) in itertools.combinations(engines, 2):
+        wins = draws = losses = 0
+        seconds = []
+        for record in records:
+            if {record["white"], record["black"]} != {first, second}:
+                continue
+            seconds.append(record["seconds"])
+            if record["result"] == "1/2-1/2":
+                draws += 1
+            elif (record["result"] == "1-0") == (record["white"] == first):
+                wins += 1
+            else:
+                losses += 1
+        games = wins + draws + losses
+        if not games:
+            continue
+        diff, margin = elo(wins, draws, losses)
+        score = (wins + draws/2) / games
+        print(f"{first + ' vs ' + second:<30}{games:>7}{wins:>6}{draws:>7}{losses:>8}{score:>8.1%}"
+            f"{diff:>8.0f} +/- {margin:<4.0f}{sum(seconds) / games:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="headless AI vs AI games over a process pool")
+    parser.add_argument("--engine", action="append", required=True,
+        help="name:depth=3,time_limit=0.1,tt_mb=16,eval_mb=4,pawn_mb=1,ordering=captures+killers|none,selective=pvs+lmr|none, give at least two")
+    parser.add_argument("--games", type=int, default=20, help="games per pair of engines, openings are played with both colors")
+    parser.add_argument("--position", choices=POSITIONS, default="starting_board")
+    parser.add_argument("--board", choices=BOARDS, default="bitboard")
+    parser.add_argument("--random-plies", type=int, default=4, help="random opening moves so games differ")
+    parser.add_argument("--max-plies", type=int, default=200, help="draw after this many plies")
+    parser.add_argument("--adjudicate-material", type=int, default=900, help="material lead that counts as a win")
+    parser.add_argument("--adjudicate-plies", type=int, default=10, help="plies the lead must hold")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log", default="tournament.jsonl", help="one JSON line per finished game")
+    args = parser.parse_args()
+
+    engines = [parse_engine(spec) for spec in args.engine]
+    if len(engines) < 2 or len({name for name, _ in engines}) != len(engines):
+        parser.error("give at least two engines with different names")
+    tasks = make_tasks(engines, args.games, args.position, args.board, args.random_plies, args.max_plies,
+        args.adjudicate_material, args.adjudicate_plies, args.seed)
+    records = []
+    start = time.perf_counter()
+    with open(args.log, "w") as log, ProcessPoolExecutor(args.workers) as executor:
+        for future in as_completed([executor.submit(play_game, task) for task in tasks]):
+            record = future.result()
+            records.append(record)
+            log.write(json.dumps(record) + "\n")
+            log.flush()
+            print(f"game {record['game']:>4}: {record['white']} - {record['black']} {record['result']:<8}"
+                f"{record['reason']:<12}{record['plies']:>4} plies {record['seconds']:>7.2f}s")
+    print(f"{len(records)} games in {time.perf_counter() - start:.1f}s, log in {args.log}")
+    print_table(engines, records)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,16 @@
 from Classes.board import Board, InvalidCoordError
+from Classes.bitboard import BitBoard
 from Classes.chessPieces import *
 from Classes.players import HumanPlayer, AIPlayer
+from Classes.transposition import TranspositionTable
+from Classes.shared_transposition import SharedTranspositionTable
+from Classes.fen import parse_fen
+from Classes.profiling import StackSampler
+import argparse
+import cProfile
+import json
 import pprint
+import pstats
 from Setup.init_board_reprs import *
 from time import sleep
 
@@ -13,9 +22,25 @@ def prnt(s):
     pp.pprint(s)
 
 class Game:
-    def __init__(self, white_player=None, black_player=None, init_board_repr=None):
-        self.board = Board(init_board_repr)
+    def __init__(self, white_player=None, black_player=None, init_board_repr=None, board_cls=Board, tt_size_mb=16, shared_tt=False, stats_stream=None):
+        #board_cls can be Board or BitBoard, both share the same interface
+        self.board = board_cls(init_board_repr)
+        #search memory shared by every AI move of this game, tt_size_mb=0 turns it off
+        #players whose evaluation differs (quiescence, see, pawn_structure) key their entries apart, see Player.tt_salt
+        #shared_tt puts it in shared memory so parallel search workers all use the same table
+        if not tt_size_mb:
+            self.tt = None
+        elif shared_tt:
+            self.tt = SharedTranspositionTable(tt_size_mb)
+        else:
+            self.tt = TranspositionTable(tt_size_mb)
         self.turn_color = "white"
+        #moves played so far and the hash of every position so far, the current one last
+        self.ply = 0
+        self.history = [self.board.hash]
+        #file-like object that gets one JSON line of search stats per AI move, None turns stats off
+        #players read it when they are created, so pass it before adding them
+        self.stats_stream = stats_stream
         self.white_player = white_player
         self.black_player = black_player
 
@@ -28,6 +53,7 @@ class Game:
             try:
                 start, end = self.convert_coords(move[:2]), self.convert_coords(move[3:5])
                 if self.board.move_piece(start, end, self.turn_color, verbose=True):
+                    self.write_stats(move)
                     self.next_turn()
             except InvalidCoordError as e:
                 print(e)
@@ -38,21 +64,27 @@ class Game:
         print(self.board)
 
     def game_over(self):
-        if not self.check_king_alive(self.turn_color):
+        outcome = self.outcome()
+        if outcome is None:
+            return False
+        reason = outcome[1]
+        if reason == "stalemate":
+            print("STALEMATE!")
+        else:
             winner = self.get_next_player()
-            print(f"KING DEAD! {winner.name} ({winner.color}) WINS!")
-            return True
-        
+            print(f"{'KING DEAD' if reason == 'king dead' else 'CHECKMATE'}! {winner.name} ({winner.color}) WINS!")
+        return True
+
+    def outcome(self):
+        #(winning color or None for a draw, reason) once the side to move has lost or is stalemated, otherwise None
+        winner = "white" if self.turn_color == "black" else "black"
+        if not self.check_king_alive(self.turn_color):
+            return winner, "king dead"
         if self.check_for_mate(self.turn_color):
-            winner = self.get_next_player()
-            print(f"CHECKMATE! {winner.name} ({winner.color}) WINS!")
-            return True
-        
+            return winner, "checkmate"
         if self.check_for_stalemate(self.turn_color):
-            print("STALEMATE!")
-            return True
-
-        return False
+            return None, "stalemate"
+        return None
     
     def check_king_alive(self, color):
         king_pos = self.board.get_king_pos(color)
@@ -61,11 +93,7 @@ class Game:
     def check_for_stalemate(self, color):
         if self.board.in_check(color):
             return False
-        state_space = self.board.state_space(color)
-        for state in state_space:
-            if not state.in_check(color):
-                return False
-        return True
+        return not self.board.has_legal_move(color)
 
     def get_curr_player(self):
         return self.white_player if self.turn_color == "white" else self.black_player
@@ -75,6 +103,18 @@ class Game:
 
     def next_turn(self):
         self.turn_color = "white" if self.turn_color == "black" else "black"
+        self.ply += 1
+        self.history.append(self.board.hash)
+
+    def write_stats(self, move):
+        player = self.get_curr_player()
+        if self.stats_stream is None or getattr(player, "last_stats", None) is None:
+            return
+        record = {"ply": self.ply, "color": self.turn_color, "player": player.name, "move": move}
+        record.update(player.last_stats)
+        player.last_stats = None
+        self.stats_stream.write(json.dumps(record) + "\n")
+        self.stats_stream.flush()
     
     def convert_coords(self, coords):
         if not isinstance(coords, str):
@@ -112,14 +152,55 @@ class Game:
 
     def check_for_mate(self, color):
         if self.board.in_check(color):
-            state_space = self.board.state_space(color)
-            for state in state_space:
-                if not state.in_check(color):
-                    return False
-            return True
+            return not self.board.has_legal_move(color)
         return False
                            
-def main():
+def profile_turns(args):
+    #plays args.turns AI moves from a Setup board or FEN without any input, once under cProfile and once
+    #under the stack sampler, and writes <out>.prof, <out>.collapsed and a summary of the top functions
+    if not args.fen and args.position not in POSITIONS:
+        raise SystemExit(f"unknown position {args.position}, choose from {', '.join(POSITIONS)}")
+    board_cls = BitBoard if args.board == "bitboard" else Board
+
+    def new_game():
+        if args.fen:
+            game = Game(init_board_repr=starting_board, board_cls=board_cls)
+            game.board, game.turn_color = parse_fen(args.fen, board_cls)
+            game.history = [game.board.hash]
+        else:
+            game = Game(init_board_repr=POSITIONS[args.position], board_cls=board_cls)
+        game.white_player = AIPlayer("AI-white", "white", game, args.depth, args.time_limit)
+        game.black_player = AIPlayer("AI-black", "black", game, args.depth, args.time_limit)
+        return game
+
+    def play_turns(game):
+        for _ in range(args.turns):
+            if game.game_over():
+                break
+            move = game.get_move()
+            game.board.move_piece(game.convert_coords(move[:2]), game.convert_coords(move[3:5]), game.turn_color)
+            game.next_turn()
+
+    profiler = cProfile.Profile()
+    game = new_game()
+    profiler.enable()
+    play_turns(game)
+    profiler.disable()
+    profiler.dump_stats(f"{args.out}.prof")
+
+    sampler = StackSampler(args.interval)
+    game = new_game()
+    sampler.start()
+    try:
+        play_turns(game)
+    finally:
+        sampler.stop()
+    sampler.write(f"{args.out}.collapsed")
+
+    pstats.Stats(profiler).strip_dirs().sort_stats("tottime").print_stats(args.top)
+    print(f"wrote {args.out}.prof (cProfile) and {args.out}.collapsed ({sum(sampler.stacks.values())} stack samples)")
+
+def play_interactive():
     players = input("Enter number of players (1 or 2): ")
     game = Game(init_board_repr=starting_board)
 
@@ -142,5 +223,23 @@ def main():
         return
     game.play()
 
+def main():
+    parser = argparse.ArgumentParser(description="play chess in the terminal, or profile AI turns with --profile")
+    parser.add_argument("--profile", action="store_true", help="play AI turns without input and profile them")
+    parser.add_argument("position", nargs="?", default="starting_board", help="board from Setup/init_board_reprs.py to profile")
+    parser.add_argument("--fen", help="profile from this FEN instead of a Setup board")
+    parser.add_argument("--board", choices=("board", "bitboard"), default="board")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per move with iterative deepening instead of a fixed depth")
+    parser.add_argument("--turns", type=int, default=1, help="AI moves to play, both sides are AI")
+    parser.add_argument("--out", default="profile", help="output path prefix")
+    parser.add_argument("--top", type=int, default=25, help="functions in the printed summary")
+    parser.add_argument("--interval", type=float, default=0.001, help="stack sampling interval in seconds of cpu time")
+    args = parser.parse_args()
+    if args.profile:
+        profile_turns(args)
+    else:
+        play_interactive()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,83 @@
+import random
+import pytest
+from Classes.board import Board
+from Classes.bitboard import BitBoard
+from Classes.fen import parse_fen
+from Classes.zobrist import SIDE_KEY, hash_board
+from Setup.init_board_reprs import POSITIONS
+from Tools.perft import FEN_REFERENCE
+
+#random games from every Setup board and perft FEN, played on a Board and a BitBoard side by side; every legal
+#move of every position is made and unmade on both and the whole board state must come back unchanged
+PLIES = 24
+STARTS = [(name, None) for name in POSITIONS] + [(None, fen) for fen in FEN_REFERENCE]
+
+def board_state(board):
+    #every field make_move/unmake_move touch on a Board, with the piece objects read back from the grid
+    grid = tuple((row, col, piece.color, piece.name, piece.position) for row, pieces in enumerate(board.board)
+        for col, piece in enumerate(pieces) if piece is not None)
+    by_color = {color: sorted((position, piece.name, piece.color) for position, piece in pieces.items())
+        for color, pieces in board.pieces_by_color.items()}
+    return grid, by_color, dict(board.king_pos), board.unmoved, board.hash, dict(board.material_score)
+
+def bitboard_state(board):
+    pieces = {color: dict(names) for color, names in board.pieces.items()}
+    return pieces, dict(board.occupancy), board.unmoved, board.hash, dict(board.material_score)
+
+def full_hash(board):
+    return hash_board(board) if isinstance(board, Board) else board.compute_hash()
+
+def check_consistent(board, side):
+    #incremental fields against values computed from scratch, side is SIDE_KEY when black is to move
+    assert board.hash == full_hash(board) ^ side
+    for color in ("white", "black"):
+        assert board.material(color) == sum(piece.value for piece in board.get_pieces() if piece.color == color)
+    if isinstance(board, Board):
+        for (row, col), piece in [(p, q) for pieces in board.pieces_by_color.values() for p, q in pieces.items()]:
+            assert board.board[row][col] is piece and piece.position == (row, col)
+        for color in ("white", "black"):
+            kings = [p for p, q in board.pieces_by_color[color].items() if q.name == "King"]
+            assert board.king_pos[color] == (kings[0] if kings else None)
+    else:
+        for color in ("white", "black"):
+            occupancy = 0
+            for bits in board.pieces[color].values():
+                occupancy |= bits
+            assert board.occupancy[color] == occupancy
+
+def start_boards(name, fen):
+    if fen is None:
+        return Board(POSITIONS[name]), BitBoard(POSITIONS[name]), "white"
+    board, color = parse_fen(fen, Board)
+    return board, parse_fen(fen, BitBoard)[0], color
+
+@pytest.mark.parametrize("name, fen", STARTS)
+def test_make_unmake_restores_state(name, fen):
+    board, bitboard, color = start_boards(name, fen)
+    rng = random.Random(name or fen)
+    side = board.hash ^ full_hash(board)
+    for _ in range(PLIES):
+        assert board.hash == bitboard.hash
+        assert board.unmoved == bitboard.unmoved
+        assert board.piece_bitboards() == bitboard.piece_bitboards()
+        moves = board.legal_moves(color)
+        assert sorted(moves) == sorted(bitboard.legal_moves(color))
+        assert board.in_check(color) == bitboard.in_check(color)
+        if not moves:
+            break
+        for b, state in ((board, board_state), (bitboard, bitboard_state)):
+            check_consistent(b, side)
+            before = state(b)
+            for move in moves:
+                record = b.make_move(move[0], move[1])
+                check_consistent(b, side ^ SIDE_KEY)
+                b.unmake_move(record)
+                assert state(b) == before
+            b.make_null_move()
+            b.unmake_null_move()
+            assert state(b) == before
+        move = rng.choice(sorted(moves))
+        board.make_move(move[0], move[1])
+        bitboard.make_move(move[0], move[1])
+        color = "white" if color == "black" else "black"
+        side ^= SIDE_KEY